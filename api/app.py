@@ -1,25 +1,34 @@
 import asyncio
+import logging
 from contextlib import asynccontextmanager
 from contextlib import suppress
 from typing import Optional
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums import ParseMode
 from aiogram.types import Update
 from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
+import orjson
 
 from core.bootstrap_artifacts import load_bootstrap_questions
 from mlcore.llm_client import LLMApiClient
 from mlcore.rag.retriever import KnowledgeRetriever
 from core.runtime import (
+    get_knowledge_retriever,
+    set_faq_answers,
     set_knowledge_retriever,
     set_llm_client,
     set_rag_min_relevance_score,
     set_start_questions,
 )
 from core.settings import Settings
-from supportbot.telegram.handlers import router
+from supportbot.telegram.handlers import precompute_faq_answers, router, warmup
+from supportbot.telegram.rate_limit import SendRateLimiter
+
+logger = logging.getLogger(__name__)
 
 
 def create_app(settings: Settings) -> FastAPI:
@@ -36,31 +45,46 @@ def create_app(settings: Settings) -> FastAPI:
         gigachat_verify_ssl=settings.gigachat_verify_ssl,
     )
     set_llm_client(llm_client)
-    retriever = KnowledgeRetriever.from_directory(
-        knowledge_dir=settings.knowledge_dir,
-        chunk_size_chars=settings.rag_chunk_size_chars,
-        chunk_overlap_chars=settings.rag_chunk_overlap_chars,
-        top_k=settings.rag_top_k,
-    )
-    set_knowledge_retriever(retriever)
     set_rag_min_relevance_score(settings.rag_min_relevance_score)
-    set_start_questions(
-        load_bootstrap_questions(
-            path=settings.generated_faq_file,
-            limit=settings.start_faq_limit,
-        )
-    )
 
+    session = AiohttpSession(json_loads=orjson.loads, json_dumps=_json_dumps)
     bot = Bot(
         token=settings.bot_token,
+        session=session,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
+    bot.session.middleware(SendRateLimiter())
     dispatcher = Dispatcher()
     dispatcher.include_router(router)
     webhook_url = f"{settings.webhook_base_url}{settings.webhook_path}"
 
+    async def warm_faq_answers(questions: list[str]) -> None:
+        set_faq_answers(await precompute_faq_answers(questions))
+
     @asynccontextmanager
     async def lifespan(_: FastAPI):
+        retriever, start_questions = await asyncio.gather(
+            asyncio.to_thread(
+                KnowledgeRetriever.from_directory,
+                knowledge_dir=settings.knowledge_dir,
+                chunk_size_chars=settings.rag_chunk_size_chars,
+                chunk_overlap_chars=settings.rag_chunk_overlap_chars,
+                top_k=settings.rag_top_k,
+                cache_size=settings.rag_cache_size,
+                cache_min_similarity=settings.rag_cache_min_similarity,
+                index_file=settings.rag_index_file,
+            ),
+            asyncio.to_thread(
+                load_bootstrap_questions,
+                path=settings.generated_faq_file,
+                limit=settings.start_faq_limit,
+            ),
+        )
+        set_knowledge_retriever(retriever)
+        set_start_questions(start_questions)
+        warmup_task = asyncio.create_task(warmup())
+        faq_task = asyncio.create_task(warm_faq_answers(start_questions))
+
         polling_task: Optional[asyncio.Task] = None
         if settings.bot_mode == "webhook":
             await bot.set_webhook(webhook_url)
@@ -76,6 +100,14 @@ def create_app(settings: Settings) -> FastAPI:
         try:
             yield
         finally:
+            for task in (warmup_task, faq_task):
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                except Exception:
+                    logger.warning("Startup background task failed", exc_info=True)
             if settings.bot_mode == "webhook":
                 await bot.delete_webhook(drop_pending_updates=False)
             else:
@@ -84,24 +116,36 @@ def create_app(settings: Settings) -> FastAPI:
                     polling_task.cancel()
                     with suppress(asyncio.CancelledError, asyncio.TimeoutError):
                         await asyncio.wait_for(polling_task, timeout=3)
+            await llm_client.close()
             await bot.session.close()
 
-    app = FastAPI(title="Adaptive Support Bot API", lifespan=lifespan)
+    app = FastAPI(
+        title="Adaptive Support Bot API",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
+    )
 
     @app.get("/health")
     async def health() -> dict[str, str | int]:
+        retriever = get_knowledge_retriever()
         return {
             "status": "ok",
             "mode": settings.bot_mode,
             "llm_model": llm_client.model,
             "rag_chunks": retriever.chunk_count,
+            "rag_cache_hits": retriever.cache_hits,
+            "rag_cache_misses": retriever.cache_misses,
         }
 
     @app.post(settings.webhook_path)
     async def telegram_webhook(request: Request) -> dict[str, bool]:
-        payload = await request.json()
-        update = Update.model_validate(payload, context={"bot": bot})
+        body = await request.body()
+        update = Update.model_validate_json(body, context={"bot": bot})
         await dispatcher.feed_update(bot, update)
         return {"ok": True}
 
     return app
+
+
+def _json_dumps(value: object) -> str:
+    return orjson.dumps(value).decode()
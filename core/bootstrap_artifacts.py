@@ -1,15 +1,16 @@
-import json
 from pathlib import Path
 
+import orjson
+
 
 def load_bootstrap_questions(path: str, limit: int) -> list[str]:
     file_path = Path(path)
-    if not file_path.exists():
+    if limit <= 0 or not file_path.exists():
         return []
 
     try:
-        data = json.loads(file_path.read_text(encoding="utf-8"))
-    except (json.JSONDecodeError, OSError):
+        data = orjson.loads(file_path.read_bytes())
+    except (orjson.JSONDecodeError, OSError):
         return []
 
     raw = data.get("questions", [])
@@ -21,6 +22,6 @@ def load_bootstrap_questions(path: str, limit: int) -> list[str]:
         question = str(item).strip()
         if question:
             questions.append(question)
-        if len(questions) >= max(limit, 0):
-            break
+            if len(questions) >= limit:
+                break
     return questions
@@ -1,13 +1,20 @@
-import json
 import os
 import re
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterable, Optional
+
+import orjson
+
+from mlcore.rag.knowledge_files import list_knowledge_files
 
 
 QUESTION_RE = re.compile(r"^\s*В:\s*(.+?)\s*$", re.IGNORECASE)
 ANSWER_RE = re.compile(r"^\s*О:\s*(.+?)\s*$", re.IGNORECASE)
+_QUESTION_PREFIXES = ("В:", "в:")
+_ANSWER_PREFIXES = ("О:", "о:")
+# questions differing only in case, spacing or punctuation count as duplicates
+_QUESTION_KEY_TRANS = str.maketrans("", "", " \t\n\r.,!?;:«»\"'()")
 
 
 def run_bootstrap(knowledge_dir: str, generated_dir: str, faq_file: str) -> dict:
@@ -21,22 +28,20 @@ def run_bootstrap(knowledge_dir: str, generated_dir: str, faq_file: str) -> dict
     questions: list[str] = []
     faq_pairs: list[dict[str, str]] = []
     sources: list[str] = []
+    seen_questions: set[str] = set()
+    seen_sources: set[str] = set()
 
     if root.exists():
-        for path in sorted(root.rglob("*")):
-            if not path.is_file():
-                continue
-            if path.suffix.lower() not in {".md", ".txt"}:
-                continue
-            sources.append(str(path.relative_to(root)))
-            text = path.read_text(encoding="utf-8", errors="ignore")
-            file_questions, file_pairs = _extract_faq(text)
-            questions.extend(file_questions)
+        for path in list_knowledge_files(root):
+            _append_unique(str(path.relative_to(root)), sources, seen_sources)
+            with path.open("r", encoding="utf-8", errors="ignore") as handle:
+                file_questions, file_pairs = _extract_faq_lines(handle)
+            for question in file_questions:
+                _append_unique(question, questions, seen_questions, _question_key)
             faq_pairs.extend(file_pairs)
 
-    unique_questions = _unique(questions)
-    if not unique_questions:
-        unique_questions = [
+    if not questions:
+        questions = [
             "Какой срок возврата товара?",
             "Сколько стоит доставка?",
             "Как связаться с оператором?",
@@ -45,35 +50,38 @@ def run_bootstrap(knowledge_dir: str, generated_dir: str, faq_file: str) -> dict
     data = {
         "generated_at": datetime.now(timezone.utc).isoformat(),
         "knowledge_dir": knowledge_dir,
-        "sources": _unique(sources),
-        "questions": unique_questions,
+        "sources": sources,
+        "questions": questions,
         "faq": faq_pairs,
     }
 
-    out_file.write_text(
-        json.dumps(data, ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
+    # write next to the target and swap, so readers never see a half-written file
+    tmp_file = out_file.with_name(out_file.name + ".tmp")
+    tmp_file.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    os.replace(tmp_file, out_file)
     return data
 
 
-def _extract_faq(text: str) -> tuple[list[str], list[dict[str, str]]]:
+def _extract_faq_lines(lines: Iterable[str]) -> tuple[list[str], list[dict[str, str]]]:
     questions: list[str] = []
     pairs: list[dict[str, str]] = []
     pending_question: Optional[str] = None
+    match_question = QUESTION_RE.match
+    match_answer = ANSWER_RE.match
 
-    for raw_line in text.splitlines():
+    for raw_line in lines:
         line = raw_line.strip()
         if not line:
             continue
 
-        q_match = QUESTION_RE.match(line)
+        # most lines carry no Q/A marker, so check the prefix before running a regex
+        q_match = match_question(line) if line.startswith(_QUESTION_PREFIXES) else None
         if q_match:
             pending_question = q_match.group(1).strip()
             questions.append(pending_question)
             continue
 
-        a_match = ANSWER_RE.match(line)
+        a_match = match_answer(line) if line.startswith(_ANSWER_PREFIXES) else None
         if a_match and pending_question:
             pairs.append({"q": pending_question, "a": a_match.group(1).strip()})
             pending_question = None
@@ -87,19 +95,24 @@ def _extract_faq(text: str) -> tuple[list[str], list[dict[str, str]]]:
     return questions, pairs
 
 
-def _unique(values: list[str]) -> list[str]:
-    seen: set[str] = set()
-    out: list[str] = []
-    for value in values:
-        key = value.strip()
-        if not key:
-            continue
-        lowered = key.lower()
-        if lowered in seen:
-            continue
-        seen.add(lowered)
-        out.append(key)
-    return out
+def _append_unique(
+    value: str,
+    out: list[str],
+    seen: set[str],
+    fingerprint: Callable[[str], str] = str.lower,
+) -> None:
+    value = value.strip()
+    if not value:
+        return
+    key = fingerprint(value)
+    if not key or key in seen:
+        return
+    seen.add(key)
+    out.append(value)
+
+
+def _question_key(question: str) -> str:
+    return question.translate(_QUESTION_KEY_TRANS).casefold()
 
 
 if __name__ == "__main__":
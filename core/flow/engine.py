@@ -3,6 +3,7 @@ from typing import Optional
 
 from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from cachetools import LRUCache
 
 from core.flow.models import Block, Flow
 
@@ -14,66 +15,90 @@ class RenderItem:
     keyboard: Optional[InlineKeyboardMarkup] = None
 
 
+_MAX_FLOW_SESSIONS = 100_000
+
+
 class FlowEngine:
-    def __init__(self, flow: Flow):
+    def __init__(self, flow: Flow, max_tracked_users: int = _MAX_FLOW_SESSIONS):
         self._flow = flow
-        self._user_state: dict[int, str] = {}
+        self._block_index: dict[str, int] = {
+            block_id: idx for idx, block_id in enumerate(flow.blocks)
+        }
+        self._blocks: tuple[Block, ...] = tuple(flow.blocks.values())
+        self._next_index: tuple[Optional[int], ...] = tuple(
+            self._block_index[block.next_block] if block.next_block else None
+            for block in self._blocks
+        )
+        self._start_index = self._block_index[flow.start_block]
+        self._button_targets: tuple[dict[str, int], ...] = tuple(
+            {
+                button.button_id: self._block_index[button.next_block]
+                for button in block.buttons
+            }
+            for block in self._blocks
+        )
+        self._render_items: tuple[RenderItem, ...] = tuple(
+            _to_render_item(block) for block in self._blocks
+        )
+        self._chains: tuple[tuple[tuple[RenderItem, ...], int], ...] = tuple(
+            self._resolve_chain(idx) for idx in range(len(self._blocks))
+        )
+        self._user_state: LRUCache[int, int] = LRUCache(maxsize=max_tracked_users)
 
     @property
     def flow_id(self) -> str:
         return self._flow.flow_id
 
     def start(self, user_id: int) -> list[RenderItem]:
-        blocks, current = self._resolve_chain(self._flow.start_block)
-        self._user_state[user_id] = current.block_id
-        return [self._to_render_item(block) for block in blocks]
+        items, current = self._chains[self._start_index]
+        self._user_state[user_id] = current
+        return list(items)
 
     def on_button(self, user_id: int, button_id: str) -> list[RenderItem]:
-        current_id = self._user_state.get(user_id, self._flow.start_block)
-        current_block = self._flow.blocks[current_id]
-        next_id = None
-        for button in current_block.buttons:
-            if button.button_id == button_id:
-                next_id = button.next_block
-                break
-        if not next_id:
-            blocks, current = self._resolve_chain(current_id)
-            self._user_state[user_id] = current.block_id
-            return [self._to_render_item(block) for block in blocks]
-
-        blocks, current = self._resolve_chain(next_id)
-        self._user_state[user_id] = current.block_id
-        return [self._to_render_item(block) for block in blocks]
+        current_idx = self._user_state.get(user_id, self._start_index)
+        next_idx = self._button_targets[current_idx].get(button_id)
+        if next_idx is None:
+            items, current = self._chains[current_idx]
+        else:
+            items, current = self._chains[next_idx]
+        self._user_state[user_id] = current
+        return list(items)
 
-    def _resolve_chain(self, start_block_id: str) -> tuple[list[Block], Block]:
+    def _resolve_chain(self, start_idx: int) -> tuple[tuple[RenderItem, ...], int]:
         max_depth = 20
-        chain: list[Block] = []
-        current = self._flow.blocks[start_block_id]
-        visited: set[str] = set()
+        chain: list[RenderItem] = []
+        current = start_idx
+        visited: set[int] = set()
 
         for _ in range(max_depth):
-            chain.append(current)
-            if current.block_id in visited:
+            block = self._blocks[current]
+            chain.append(self._render_items[current])
+            if current in visited:
                 break
-            visited.add(current.block_id)
-            if current.has_interaction or not current.next_block:
+            visited.add(current)
+            next_idx = self._next_index[current]
+            if block.has_interaction or next_idx is None:
                 break
-            current = self._flow.blocks[current.next_block]
-        return chain, current
-
-    def _to_render_item(self, block: Block) -> RenderItem:
-        keyboard = None
-        if block.has_interaction:
-            kb = InlineKeyboardBuilder()
-            for button in block.buttons:
-                kb.button(
-                    text=button.text,
-                    callback_data=f"flow:{button.button_id}",
-                )
-            kb.adjust(1)
-            keyboard = kb.as_markup()
-        return RenderItem(
-            text=block.text,
-            rules_hide_on_next=block.rules.hide_on_next,
-            keyboard=keyboard,
+            current = next_idx
+        return tuple(chain), current
+
+
+def _to_render_item(block: Block) -> RenderItem:
+    return RenderItem(
+        text=block.text,
+        rules_hide_on_next=block.rules.hide_on_next,
+        keyboard=_build_keyboard(block),
+    )
+
+
+def _build_keyboard(block: Block) -> Optional[InlineKeyboardMarkup]:
+    if not block.has_interaction:
+        return None
+    kb = InlineKeyboardBuilder()
+    for button in block.buttons:
+        kb.button(
+            text=button.text,
+            callback_data=f"flow:{button.button_id}",
         )
+    kb.adjust(1)
+    return kb.as_markup()
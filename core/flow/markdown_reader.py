@@ -1,16 +1,30 @@
 import re
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, List, Optional, Tuple
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
 
 import yaml
 
 from core.flow.models import Block, Button, Flow, Rules
 
-_FLOW_HEADER_RE = re.compile(r"^#\s*Support Flow:\s*([A-Za-z0-9_.-]+)\s*$")
-_BLOCK_HEADER_RE = re.compile(r"^##\s*block:\s*([A-Za-z0-9_.-]+)\s*$")
-_SEPARATOR_RE = re.compile(r"^\s*---\s*$")
-_ALLOWED_TYPES = {"message", "menu", "mes-menu"}
+_FLOW_HEADER_RE = re.compile(r"\s*#\s*Support Flow:\s*([A-Za-z0-9_.-]+)\s*")
+_BLOCK_HEADER_RE = re.compile(r"\s*##\s*block:\s*([A-Za-z0-9_.-]+)\s*")
+_SEPARATOR_RE = re.compile(r"\s*---\s*")
+_ALLOWED_TYPES = frozenset({"message", "menu", "mes-menu"})
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_BODY_KEY_RE = re.compile(r"([A-Za-z_][A-Za-z0-9_-]*):(?:[ ]+(.*))?")
+_YAML_TRUE = frozenset({"true", "True", "TRUE", "yes", "Yes", "YES", "on", "On", "ON"})
+_YAML_FALSE = frozenset({"false", "False", "FALSE", "no", "No", "NO", "off", "Off", "OFF"})
+_YAML_NULL = frozenset({"", "~", "null", "Null", "NULL"})
+_YAML_RESERVED_KEYS = _YAML_TRUE | _YAML_FALSE | _YAML_NULL
+# plain scalars YAML always reads as the same string: a letter first, then only
+# letters, digits, spaces and punctuation without YAML meaning
+_PLAIN_SCALAR_RE = re.compile(r"[^\W\d_][\w ,.!?()«»/'\"%;-]*")
+
+
+class _UnsupportedBody(Exception):
+    pass
 
 
 @dataclass(frozen=True)
@@ -37,36 +51,40 @@ def load_flow_from_markdown(path: str) -> Flow:
             [FlowSpecError(code="E_FLOW_FILE_NOT_FOUND", message=f"File not found: {path}")]
         )
 
-    content = source.read_text(encoding="utf-8")
-    lines = content.splitlines()
-    if not lines:
-        raise FlowSpecValidationError(
-            [FlowSpecError(code="E_FLOW_HEADER", message="Empty flow file.")]
-        )
+    # an unchanged file (same mtime and size) reuses the already validated flow
+    stat = source.stat()
+    return _load_flow_cached(str(source.resolve()), stat.st_mtime_ns, stat.st_size)
 
-    header_match = _FLOW_HEADER_RE.match(lines[0].strip())
-    if not header_match:
-        raise FlowSpecValidationError(
-            [
-                FlowSpecError(
-                    code="E_FLOW_HEADER",
-                    message="First line must be '# Support Flow: <flow_id>'.",
-                )
-            ]
-        )
 
-    flow_id = header_match.group(1)
-    blocks_text = _split_blocks(lines[1:])
-    blocks: dict[str, Block] = {}
-    errors: list[FlowSpecError] = []
+@lru_cache(maxsize=8)
+def _load_flow_cached(path: str, mtime_ns: int, size: int) -> Flow:
+    with open(path, encoding="utf-8") as handle:
+        lines = (line.rstrip("\n") for line in handle)
+        first_line = next(lines, None)
+        if first_line is None:
+            raise FlowSpecValidationError(
+                [FlowSpecError(code="E_FLOW_HEADER", message="Empty flow file.")]
+            )
 
-    for chunk in blocks_text:
-        if not chunk:
-            continue
-        block, block_errors = _parse_block(chunk)
-        errors.extend(block_errors)
-        if block:
-            if block.block_id in blocks:
+        header_match = _FLOW_HEADER_RE.fullmatch(first_line)
+        if not header_match:
+            raise FlowSpecValidationError(
+                [
+                    FlowSpecError(
+                        code="E_FLOW_HEADER",
+                        message="First line must be '# Support Flow: <flow_id>'.",
+                    )
+                ]
+            )
+
+        flow_id = header_match.group(1)
+        blocks: dict[str, Block] = {}
+        errors: list[FlowSpecError] = []
+
+        for chunk in _iter_blocks(lines):
+            block, block_errors = _parse_block(chunk)
+            errors.extend(block_errors)
+            if block and blocks.setdefault(block.block_id, block) is not block:
                 errors.append(
                     FlowSpecError(
                         code="E_DUPLICATE_BLOCK_ID",
@@ -74,8 +92,6 @@ def load_flow_from_markdown(path: str) -> Flow:
                         block_id=block.block_id,
                     )
                 )
-            else:
-                blocks[block.block_id] = block
 
     errors.extend(_validate_graph(blocks))
     if errors:
@@ -84,19 +100,17 @@ def load_flow_from_markdown(path: str) -> Flow:
     return Flow(flow_id=flow_id, start_block="start", blocks=blocks)
 
 
-def _split_blocks(lines: list[str]) -> list[list[str]]:
-    chunks: list[list[str]] = []
+def _iter_blocks(lines: Iterable[str]) -> Iterator[list[str]]:
     current: list[str] = []
     for line in lines:
-        if _SEPARATOR_RE.match(line):
+        if _SEPARATOR_RE.fullmatch(line):
             if current:
-                chunks.append(current)
+                yield current
                 current = []
             continue
         current.append(line)
     if current:
-        chunks.append(current)
-    return chunks
+        yield current
 
 
 def _parse_block(lines: List[str]) -> Tuple[Optional[Block], List[FlowSpecError]]:
@@ -110,7 +124,7 @@ def _parse_block(lines: List[str]) -> Tuple[Optional[Block], List[FlowSpecError]
     if not lines:
         return None, errors
 
-    header_match = _BLOCK_HEADER_RE.match(lines[0].strip())
+    header_match = _BLOCK_HEADER_RE.fullmatch(lines[0])
     if not header_match:
         return None, [
             FlowSpecError(
@@ -119,19 +133,21 @@ def _parse_block(lines: List[str]) -> Tuple[Optional[Block], List[FlowSpecError]
             )
         ]
     block_id = header_match.group(1)
-    body = "\n".join(lines[1:]).strip()
-    payload: dict[str, Any] = {}
-    if body:
-        loaded = yaml.safe_load(body)
-        if not isinstance(loaded, dict):
-            return None, [
-                FlowSpecError(
-                    code="E_BLOCK_BODY",
-                    message="Block body must be a key-value mapping.",
-                    block_id=block_id,
-                )
-            ]
-        payload = loaded
+    payload = _parse_block_body(lines[1:])
+    if payload is None:
+        payload = {}
+        body = "\n".join(lines[1:]).strip()
+        if body:
+            loaded = yaml.load(body, Loader=_YAML_LOADER)
+            if not isinstance(loaded, dict):
+                return None, [
+                    FlowSpecError(
+                        code="E_BLOCK_BODY",
+                        message="Block body must be a key-value mapping.",
+                        block_id=block_id,
+                    )
+                ]
+            payload = loaded
 
     block_type = str(payload.get("type", "")).strip()
     if block_type not in _ALLOWED_TYPES:
@@ -255,6 +271,105 @@ def _parse_block(lines: List[str]) -> Tuple[Optional[Block], List[FlowSpecError]
     )
 
 
+def _parse_block_body(lines: List[str]) -> Optional[dict[str, Any]]:
+    # Fast path for the block layout used by flow specs: top-level scalars,
+    # one level of nested mapping (rules, button) and a list of flat mappings
+    # (buttons). Returns None for anything else so the caller falls back to YAML.
+    entries: list[tuple[int, str]] = []
+    for line in lines:
+        content = line.lstrip(" ")
+        if not content or content.startswith("#"):
+            continue
+        if "\t" in line:
+            return None
+        entries.append((len(line) - len(content), content.rstrip()))
+
+    try:
+        payload: dict[str, Any] = {}
+        idx = 0
+        while idx < len(entries):
+            indent, content = entries[idx]
+            if indent != 0:
+                return None
+            key, raw_value = _split_body_key(content)
+            idx += 1
+            nested_end = idx
+            while nested_end < len(entries) and entries[nested_end][0] > 0:
+                nested_end += 1
+            nested = entries[idx:nested_end]
+            idx = nested_end
+            if raw_value is not None:
+                if nested:
+                    return None
+                payload[key] = _parse_plain_scalar(raw_value)
+            elif not nested:
+                payload[key] = None
+            elif nested[0][1].startswith("- "):
+                payload[key] = _parse_body_list(nested)
+            else:
+                payload[key] = _parse_body_mapping(nested)
+        return payload
+    except _UnsupportedBody:
+        return None
+
+
+def _parse_body_mapping(entries: list[tuple[int, str]]) -> dict[str, Any]:
+    indent = entries[0][0]
+    mapping: dict[str, Any] = {}
+    for entry_indent, content in entries:
+        if entry_indent != indent:
+            raise _UnsupportedBody()
+        key, raw_value = _split_body_key(content)
+        if raw_value is None:
+            raise _UnsupportedBody()
+        mapping[key] = _parse_plain_scalar(raw_value)
+    return mapping
+
+
+def _parse_body_list(entries: list[tuple[int, str]]) -> list[dict[str, Any]]:
+    dash_indent = entries[0][0]
+    items: list[dict[str, Any]] = []
+    key_indent = -1
+    for entry_indent, content in entries:
+        if entry_indent == dash_indent and content.startswith("- "):
+            item_content = content[2:].lstrip(" ")
+            key_indent = dash_indent + len(content) - len(item_content)
+            items.append({})
+            content = item_content
+        elif entry_indent != key_indent:
+            raise _UnsupportedBody()
+        key, raw_value = _split_body_key(content)
+        if raw_value is None:
+            raise _UnsupportedBody()
+        items[-1][key] = _parse_plain_scalar(raw_value)
+    return items
+
+
+def _split_body_key(content: str) -> tuple[str, Optional[str]]:
+    match = _BODY_KEY_RE.fullmatch(content)
+    if not match or match.group(1) in _YAML_RESERVED_KEYS:
+        raise _UnsupportedBody()
+    return match.group(1), match.group(2)
+
+
+def _parse_plain_scalar(raw: str) -> Any:
+    value = raw.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        inner = value[1:-1]
+        if value[0] in inner or "\\" in inner or not inner.isprintable():
+            raise _UnsupportedBody()
+        return inner
+    if value in _YAML_NULL:
+        return None
+    if value in _YAML_TRUE:
+        return True
+    if value in _YAML_FALSE:
+        return False
+    if not _PLAIN_SCALAR_RE.fullmatch(value):
+        raise _UnsupportedBody()
+    return value
+
+
 def _parse_buttons(
     raw_buttons: list[dict[str, Any]],
     block_id: str,
@@ -309,9 +424,9 @@ def _validate_graph(blocks: dict[str, Block]) -> list[FlowSpecError]:
         )
         return errors
 
-    terminal_exists = False
+    valid_ids = frozenset(blocks)
     for block in blocks.values():
-        if block.next_block and block.next_block not in blocks:
+        if block.next_block and block.next_block not in valid_ids:
             errors.append(
                 FlowSpecError(
                     code="E_INVALID_NEXT",
@@ -320,7 +435,7 @@ def _validate_graph(blocks: dict[str, Block]) -> list[FlowSpecError]:
                 )
             )
         for button in block.buttons:
-            if button.next_block not in blocks:
+            if button.next_block not in valid_ids:
                 errors.append(
                     FlowSpecError(
                         code="E_INVALID_NEXT",
@@ -328,11 +443,10 @@ def _validate_graph(blocks: dict[str, Block]) -> list[FlowSpecError]:
                         block_id=block.block_id,
                     )
                 )
-        if not block.next_block and not block.buttons:
-            terminal_exists = True
 
-    if "end" in blocks:
-        terminal_exists = True
+    terminal_exists = "end" in valid_ids or any(
+        not block.next_block and not block.buttons for block in blocks.values()
+    )
     if not terminal_exists:
         errors.append(
             FlowSpecError(
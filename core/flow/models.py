@@ -2,20 +2,20 @@ from dataclasses import dataclass, field
 from typing import Optional
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Rules:
     hide_on_next: bool = False
     replace_menu: bool = False
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Button:
     button_id: str
     text: str
     next_block: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Block:
     block_id: str
     block_type: str
@@ -30,7 +30,7 @@ class Block:
         return len(self.buttons) > 0
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Flow:
     flow_id: str
     start_block: str
@@ -1,3 +1,4 @@
+from collections.abc import Mapping
 from typing import Optional
 
 from core.flow.engine import FlowEngine
@@ -8,6 +9,7 @@ _flow_engine: Optional[FlowEngine] = None
 _llm_client: Optional[LLMApiClient] = None
 _knowledge_retriever: Optional[KnowledgeRetriever] = None
 _start_questions: list[str] = []
+_faq_answers: Mapping[int, tuple[str, bool]] = {}
 _rag_min_relevance_score: float = 0.12
 
 
@@ -53,6 +55,15 @@ def get_start_questions() -> list[str]:
     return _start_questions
 
 
+def set_faq_answers(answers: Mapping[int, tuple[str, bool]]) -> None:
+    global _faq_answers
+    _faq_answers = answers
+
+
+def get_faq_answers() -> Mapping[int, tuple[str, bool]]:
+    return _faq_answers
+
+
 def set_rag_min_relevance_score(value: float) -> None:
     global _rag_min_relevance_score
     _rag_min_relevance_score = value
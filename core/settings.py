@@ -1,8 +1,13 @@
 from dataclasses import dataclass
+from functools import lru_cache
 import os
 
 from dotenv import load_dotenv
 
+_TRUE_VALUES = frozenset({"1", "true", "yes", "on"})
+_BOT_MODES = frozenset({"polling", "webhook"})
+_LLM_PROVIDERS = frozenset({"openai", "gigachat"})
+
 
 @dataclass(frozen=True)
 class Settings:
@@ -27,11 +32,15 @@ class Settings:
     rag_min_relevance_score: float
     rag_chunk_size_chars: int
     rag_chunk_overlap_chars: int
+    rag_cache_size: int
+    rag_cache_min_similarity: float
+    rag_index_file: str
     generated_dir: str
     generated_faq_file: str
     start_faq_limit: int
 
 
+@lru_cache(maxsize=1)
 def load_settings() -> Settings:
     load_dotenv()
     bot_token = os.getenv("BOT_TOKEN", "").strip()
@@ -56,26 +65,26 @@ def load_settings() -> Settings:
         "GIGACHAT_API_URL", "https://gigachat.devices.sberbank.ru/api/v1/chat/completions"
     ).strip()
     gigachat_scope = os.getenv("GIGACHAT_SCOPE", "GIGACHAT_API_PERS").strip()
-    gigachat_verify_ssl = os.getenv("GIGACHAT_VERIFY_SSL", "true").strip().lower() in {
-        "1",
-        "true",
-        "yes",
-        "on",
-    }
+    gigachat_verify_ssl = (
+        os.getenv("GIGACHAT_VERIFY_SSL", "true").strip().lower() in _TRUE_VALUES
+    )
     knowledge_dir = os.getenv("KNOWLEDGE_DIR", "core/knowledge").strip()
     rag_top_k = int(os.getenv("RAG_TOP_K", "4").strip())
     rag_min_relevance_score = float(os.getenv("RAG_MIN_RELEVANCE_SCORE", "0.12").strip())
     rag_chunk_size_chars = int(os.getenv("RAG_CHUNK_SIZE_CHARS", "900").strip())
     rag_chunk_overlap_chars = int(os.getenv("RAG_CHUNK_OVERLAP_CHARS", "120").strip())
+    rag_cache_size = int(os.getenv("RAG_CACHE_SIZE", "1024").strip())
+    rag_cache_min_similarity = float(os.getenv("RAG_CACHE_MIN_SIMILARITY", "0.97").strip())
+    rag_index_file = os.getenv("RAG_INDEX_FILE", "core/generated/rag_index.pkl").strip()
     generated_dir = os.getenv("GENERATED_DIR", "core/generated").strip()
     generated_faq_file = os.getenv("GENERATED_FAQ_FILE", "core/generated/faq.json").strip()
     start_faq_limit = int(os.getenv("START_FAQ_LIMIT", "4").strip())
 
     if not bot_token:
         raise RuntimeError("BOT_TOKEN is not set. Put it in .env (see .env.example).")
-    if bot_mode not in {"polling", "webhook"}:
+    if bot_mode not in _BOT_MODES:
         raise RuntimeError("BOT_MODE must be either 'polling' or 'webhook'.")
-    if llm_provider not in {"openai", "gigachat"}:
+    if llm_provider not in _LLM_PROVIDERS:
         raise RuntimeError("LLM_PROVIDER must be either 'openai' or 'gigachat'.")
     if rag_top_k < 1:
         raise RuntimeError("RAG_TOP_K must be >= 1.")
@@ -87,6 +96,10 @@ def load_settings() -> Settings:
         raise RuntimeError("RAG_CHUNK_OVERLAP_CHARS must be >= 0.")
     if rag_chunk_overlap_chars >= rag_chunk_size_chars:
         raise RuntimeError("RAG_CHUNK_OVERLAP_CHARS must be less than RAG_CHUNK_SIZE_CHARS.")
+    if rag_cache_size < 0:
+        raise RuntimeError("RAG_CACHE_SIZE must be >= 0.")
+    if not (0.0 < rag_cache_min_similarity <= 1.0):
+        raise RuntimeError("RAG_CACHE_MIN_SIMILARITY must be in (0.0, 1.0].")
     if start_faq_limit < 0:
         raise RuntimeError("START_FAQ_LIMIT must be >= 0.")
     if bot_mode == "webhook" and not webhook_base_url:
@@ -118,6 +131,9 @@ def load_settings() -> Settings:
         rag_min_relevance_score=rag_min_relevance_score,
         rag_chunk_size_chars=rag_chunk_size_chars,
         rag_chunk_overlap_chars=rag_chunk_overlap_chars,
+        rag_cache_size=rag_cache_size,
+        rag_cache_min_similarity=rag_cache_min_similarity,
+        rag_index_file=rag_index_file,
         generated_dir=generated_dir,
         generated_faq_file=generated_faq_file,
         start_faq_limit=start_faq_limit,
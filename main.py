@@ -1,3 +1,4 @@
+import importlib.util
 import logging
 
 import uvicorn
@@ -8,6 +9,10 @@ from api.app import create_app
 settings = load_settings()
 app = create_app(settings)
 
+# uvloop and httptools ship with uvicorn[standard] but have no wheels everywhere
+_UVICORN_LOOP = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+_UVICORN_HTTP = "httptools" if importlib.util.find_spec("httptools") else "h11"
+
 
 def main() -> None:
     logging.basicConfig(
@@ -18,6 +23,8 @@ def main() -> None:
         app,
         host=settings.app_host,
         port=settings.app_port,
+        loop=_UVICORN_LOOP,
+        http=_UVICORN_HTTP,
         reload=False,
         timeout_graceful_shutdown=5,
     )
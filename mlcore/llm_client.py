@@ -1,10 +1,32 @@
 import asyncio
-import json
-import ssl
 import time
 import uuid
+from collections.abc import AsyncIterator, Sequence
 from typing import Optional
-from urllib import error, parse, request
+from urllib import parse
+
+import aiohttp
+import orjson
+
+_HTTP_POOL_LIMIT = 100
+_HTTP_KEEPALIVE_SECONDS = 75
+_HTTP_DNS_CACHE_SECONDS = 300
+_TOKEN_REFRESH_SKEW_SECONDS = 60
+_HISTORY_ROLES = frozenset({"user", "assistant"})
+_SSE_DATA_PREFIX = b"data:"
+_SSE_DONE = b"[DONE]"
+
+_SYSTEM_PROMPT = (
+    "Ты ассистент службы поддержки. Отвечай кратко и по делу. "
+    "Используй только факты из блока КОНТЕКСТ. "
+    "Учитывай историю диалога при формировании ответа. "
+    "Если в вопросе не хватает критичных деталей (товар, номер заказа, регион, срок), "
+    "сначала задай один короткий уточняющий вопрос, а не давай предположений. "
+    "Если фактов недостаточно, предложи подключить оператора. "
+    "Не упоминай слова 'контекст', 'база знаний', 'retrieval', 'RAG', "
+    "'источник документа' или внутреннюю логику системы."
+)
+_SYSTEM_MESSAGE: dict[str, str] = {"role": "system", "content": _SYSTEM_PROMPT}
 
 
 class LLMApiError(Exception):
@@ -39,101 +61,115 @@ class LLMApiClient:
         self._gigachat_verify_ssl = gigachat_verify_ssl
 
         self._gigachat_access_token: str = ""
-        self._gigachat_token_expiry_ts: float = 0.0
+        self._gigachat_token_expiry_monotonic: float = 0.0
+        self._gigachat_token_lock = asyncio.Lock()
+
+        self._http_session: Optional[aiohttp.ClientSession] = None
 
     @property
     def model(self) -> str:
         return self._model
 
+    async def close(self) -> None:
+        if self._http_session is not None and not self._http_session.closed:
+            await self._http_session.close()
+        self._http_session = None
+
     async def ask(
         self,
         user_text: str,
         context: str = "",
-        chat_history: Optional[list[dict[str, str]]] = None,
+        chat_history: Optional[Sequence[tuple[str, str]]] = None,
     ) -> str:
         if not user_text.strip():
             raise LLMApiError("Empty question.")
-        return await asyncio.to_thread(self._ask_sync, user_text, context, chat_history)
+        api_url, bearer_token, verify_ssl = await self._chat_endpoint()
+        body = self._chat_completion_body(user_text, context, chat_history, stream=False)
+        raw = await self._send_request(
+            url=api_url,
+            data=body,
+            headers=_chat_headers(bearer_token),
+            verify_ssl=verify_ssl,
+        )
+        try:
+            parsed = orjson.loads(raw)
+            content = parsed["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError, orjson.JSONDecodeError) as exc:
+            raise LLMApiError("LLM API returned unexpected response format.") from exc
 
-    def _ask_sync(
-        self,
-        user_text: str,
-        context: str,
-        chat_history: Optional[list[dict[str, str]]],
-    ) -> str:
-        if self._provider == "gigachat":
-            return self._ask_gigachat_sync(user_text, context, chat_history)
-        return self._ask_openai_compatible_sync(user_text, context, chat_history)
+        answer = str(content).strip()
+        if not answer:
+            raise LLMApiError("LLM API returned empty answer.")
+        return answer
 
-    def _ask_openai_compatible_sync(
+    async def ask_stream(
         self,
         user_text: str,
-        context: str,
-        chat_history: Optional[list[dict[str, str]]],
-    ) -> str:
+        context: str = "",
+        chat_history: Optional[Sequence[tuple[str, str]]] = None,
+    ) -> AsyncIterator[str]:
+        if not user_text.strip():
+            raise LLMApiError("Empty question.")
+        api_url, bearer_token, verify_ssl = await self._chat_endpoint()
+        body = self._chat_completion_body(user_text, context, chat_history, stream=True)
+        session = self._get_http_session()
+        try:
+            async with session.post(
+                api_url,
+                data=body,
+                headers=_chat_headers(bearer_token),
+                ssl=verify_ssl,
+            ) as resp:
+                if resp.status >= 400:
+                    details = (await resp.read()).decode("utf-8", errors="replace")
+                    raise LLMApiError(f"LLM API HTTP {resp.status}: {details}")
+                async for line in resp.content:
+                    line = line.strip()
+                    if not line.startswith(_SSE_DATA_PREFIX):
+                        continue
+                    data = line[len(_SSE_DATA_PREFIX) :].strip()
+                    if data == _SSE_DONE:
+                        return
+                    delta = _stream_delta(data)
+                    if delta:
+                        yield delta
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            raise LLMApiError(f"LLM API connection error: {exc}") from exc
+
+    async def warmup(self) -> None:
+        try:
+            api_url, _, verify_ssl = await self._chat_endpoint()
+            async with self._get_http_session().head(api_url, ssl=verify_ssl) as resp:
+                await resp.read()
+        except (LLMApiError, aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+
+    async def _chat_endpoint(self) -> tuple[str, str, bool]:
+        if self._provider == "gigachat":
+            if not self._gigachat_api_url:
+                raise LLMApiError("GIGACHAT_API_URL is not configured.")
+            access_token = await self._ensure_gigachat_access_token()
+            return self._gigachat_api_url, access_token, self._gigachat_verify_ssl
         if not self._openai_api_key:
             raise LLMApiError("LLM_API_KEY is not configured.")
         if not self._openai_api_url:
             raise LLMApiError("LLM_API_URL is not configured.")
-        return self._chat_completion_request(
-            api_url=self._openai_api_url,
-            bearer_token=self._openai_api_key,
-            user_text=user_text,
-            context=context,
-            chat_history=chat_history,
-            ssl_context=None,
-        )
-
-    def _ask_gigachat_sync(
-        self,
-        user_text: str,
-        context: str,
-        chat_history: Optional[list[dict[str, str]]],
-    ) -> str:
-        if not self._gigachat_api_url:
-            raise LLMApiError("GIGACHAT_API_URL is not configured.")
-        access_token = self._ensure_gigachat_access_token()
-        ssl_context = None
-        if not self._gigachat_verify_ssl:
-            ssl_context = ssl._create_unverified_context()
-        return self._chat_completion_request(
-            api_url=self._gigachat_api_url,
-            bearer_token=access_token,
-            user_text=user_text,
-            context=context,
-            chat_history=chat_history,
-            ssl_context=ssl_context,
-        )
+        return self._openai_api_url, self._openai_api_key, True
 
-    def _chat_completion_request(
+    def _chat_completion_body(
         self,
-        api_url: str,
-        bearer_token: str,
         user_text: str,
         context: str,
-        chat_history: Optional[list[dict[str, str]]],
-        ssl_context: ssl.SSLContext | None,
-    ) -> str:
-        system_prompt = (
-            "Ты ассистент службы поддержки. Отвечай кратко и по делу. "
-            "Используй только факты из блока КОНТЕКСТ. "
-            "Учитывай историю диалога при формировании ответа. "
-            "Если в вопросе не хватает критичных деталей (товар, номер заказа, регион, срок), "
-            "сначала задай один короткий уточняющий вопрос, а не давай предположений. "
-            "Если фактов недостаточно, предложи подключить оператора. "
-            "Не упоминай слова 'контекст', 'база знаний', 'retrieval', 'RAG', "
-            "'источник документа' или внутреннюю логику системы."
-        )
+        chat_history: Optional[Sequence[tuple[str, str]]],
+        stream: bool,
+    ) -> bytes:
         user_payload = user_text
         if context.strip():
             user_payload = f"КОНТЕКСТ:\n{context}\n\nВОПРОС:\n{user_text}"
-        messages: list[dict[str, str]] = [
-            {"role": "system", "content": system_prompt},
-        ]
-        for item in chat_history or []:
-            role = str(item.get("role", "")).strip()
-            content = str(item.get("content", "")).strip()
-            if role in {"user", "assistant"} and content:
+        messages: list[dict[str, str]] = [_SYSTEM_MESSAGE]
+        for role, content in chat_history or ():
+            content = str(content).strip()
+            if role in _HISTORY_ROLES and content:
                 messages.append({"role": role, "content": content})
         messages.append({"role": "user", "content": user_payload})
         payload = {
@@ -141,34 +177,25 @@ class LLMApiClient:
             "messages": messages,
             "temperature": 0.2,
         }
-        headers = {
-            "Authorization": f"Bearer {bearer_token}",
-            "Content-Type": "application/json",
-        }
-        body = json.dumps(payload).encode("utf-8")
-        req = request.Request(api_url, data=body, headers=headers, method="POST")
-        raw = self._send_request(req=req, ssl_context=ssl_context)
-        try:
-            parsed = json.loads(raw)
-            content = parsed["choices"][0]["message"]["content"]
-        except (KeyError, IndexError, TypeError, json.JSONDecodeError) as exc:
-            raise LLMApiError("LLM API returned unexpected response format.") from exc
-
-        answer = str(content).strip()
-        if not answer:
-            raise LLMApiError("LLM API returned empty answer.")
-        return answer
+        if stream:
+            payload["stream"] = True
+        return orjson.dumps(payload)
 
-    def _ensure_gigachat_access_token(self) -> str:
-        now = time.time()
-        if self._gigachat_access_token and now < self._gigachat_token_expiry_ts - 30:
+    async def _ensure_gigachat_access_token(self) -> str:
+        if self._gigachat_token_is_fresh():
             return self._gigachat_access_token
-        self._refresh_gigachat_access_token()
+        async with self._gigachat_token_lock:
+            if not self._gigachat_token_is_fresh():
+                await self._refresh_gigachat_access_token()
         if not self._gigachat_access_token:
             raise LLMApiError("Failed to get GigaChat access token.")
         return self._gigachat_access_token
 
-    def _refresh_gigachat_access_token(self) -> None:
+    def _gigachat_token_is_fresh(self) -> bool:
+        refresh_at = self._gigachat_token_expiry_monotonic - _TOKEN_REFRESH_SKEW_SECONDS
+        return bool(self._gigachat_access_token) and time.monotonic() < refresh_at
+
+    async def _refresh_gigachat_access_token(self) -> None:
         if not self._gigachat_auth_key:
             raise LLMApiError("GIGACHAT_AUTH_KEY is not configured.")
         if not self._gigachat_auth_url:
@@ -180,46 +207,76 @@ class LLMApiClient:
             "RqUID": str(uuid.uuid4()),
             "Content-Type": "application/x-www-form-urlencoded",
         }
-        req = request.Request(
-            self._gigachat_auth_url,
+        raw = await self._send_request(
+            url=self._gigachat_auth_url,
             data=payload,
             headers=headers,
-            method="POST",
+            verify_ssl=self._gigachat_verify_ssl,
         )
-        ssl_context = None
-        if not self._gigachat_verify_ssl:
-            ssl_context = ssl._create_unverified_context()
-        raw = self._send_request(req=req, ssl_context=ssl_context)
         try:
-            parsed = json.loads(raw)
+            parsed = orjson.loads(raw)
             access_token = str(parsed.get("access_token", "")).strip()
             expires_at_ms = int(parsed.get("expires_at", 0))
-        except (TypeError, ValueError, json.JSONDecodeError) as exc:
+        except (TypeError, ValueError, orjson.JSONDecodeError) as exc:
             raise LLMApiError("Invalid GigaChat OAuth response.") from exc
 
         if not access_token:
             raise LLMApiError("GigaChat OAuth response has empty access_token.")
 
         if expires_at_ms > 0:
-            self._gigachat_token_expiry_ts = expires_at_ms / 1000.0
+            lifetime_seconds = expires_at_ms / 1000.0 - time.time()
         else:
-            self._gigachat_token_expiry_ts = time.time() + 1500
+            lifetime_seconds = 1500.0
+        self._gigachat_token_expiry_monotonic = time.monotonic() + lifetime_seconds
         self._gigachat_access_token = access_token
 
-    def _send_request(
+    def _get_http_session(self) -> aiohttp.ClientSession:
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=_HTTP_POOL_LIMIT,
+                    keepalive_timeout=_HTTP_KEEPALIVE_SECONDS,
+                    ttl_dns_cache=_HTTP_DNS_CACHE_SECONDS,
+                ),
+                timeout=aiohttp.ClientTimeout(total=self._timeout_seconds),
+            )
+        return self._http_session
+
+    async def _send_request(
         self,
-        req: request.Request,
-        ssl_context: ssl.SSLContext | None,
-    ) -> str:
+        url: str,
+        data: bytes,
+        headers: dict[str, str],
+        verify_ssl: bool,
+    ) -> bytes:
+        session = self._get_http_session()
         try:
-            with request.urlopen(
-                req,
-                timeout=self._timeout_seconds,
-                context=ssl_context,
+            async with session.post(
+                url,
+                data=data,
+                headers=headers,
+                ssl=verify_ssl,
             ) as resp:
-                return resp.read().decode("utf-8")
-        except error.HTTPError as exc:
-            details = exc.read().decode("utf-8", errors="replace")
-            raise LLMApiError(f"LLM API HTTP {exc.code}: {details}") from exc
-        except error.URLError as exc:
+                raw = await resp.read()
+                if resp.status >= 400:
+                    details = raw.decode("utf-8", errors="replace")
+                    raise LLMApiError(f"LLM API HTTP {resp.status}: {details}")
+                return raw
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
             raise LLMApiError(f"LLM API connection error: {exc}") from exc
+
+
+def _chat_headers(bearer_token: str) -> dict[str, str]:
+    return {
+        "Authorization": f"Bearer {bearer_token}",
+        "Content-Type": "application/json",
+    }
+
+
+def _stream_delta(data: bytes) -> str:
+    try:
+        choices = orjson.loads(data)["choices"]
+        content = choices[0]["delta"].get("content") if choices else None
+    except (KeyError, IndexError, TypeError, AttributeError, orjson.JSONDecodeError) as exc:
+        raise LLMApiError("LLM API returned unexpected stream format.") from exc
+    return str(content) if content else ""
@@ -0,0 +1,117 @@
+import random
+import threading
+from functools import lru_cache
+from typing import Callable, Generic, Optional, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+_LSH_TABLES = 8
+_LSH_BITS = 16
+_PROJECTION_CACHE_SIZE = 4096
+
+
+class ProximityCache(Generic[T]):
+    def __init__(
+        self,
+        capacity: int,
+        min_similarity: float,
+        tables: int = _LSH_TABLES,
+        bits: int = _LSH_BITS,
+    ):
+        self._capacity = max(capacity, 0)
+        self._min_similarity = min_similarity
+        self._tables = tables
+        self._bits = bits
+        # entry id -> (vector, signature, value); dict order doubles as FIFO order
+        self._entries: dict[int, tuple[dict[str, float], tuple[int, ...], T]] = {}
+        self._buckets: list[dict[int, set[int]]] = [{} for _ in range(tables)]
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self,
+        vector: dict[str, float],
+        accept: Optional[Callable[[T], bool]] = None,
+    ) -> Optional[T]:
+        if not self._capacity:
+            self.misses += 1
+            return None
+        signature = self._signature(vector)
+        best_value: Optional[T] = None
+        best_similarity = self._min_similarity
+        with self._lock:
+            candidates: set[int] = set()
+            for table, key in zip(self._buckets, signature):
+                candidates.update(table.get(key, ()))
+            for entry_id in candidates:
+                cached_vector, _, value = self._entries[entry_id]
+                similarity = _cosine(vector, cached_vector)
+                # rejected candidates are skipped, so they cannot hide a usable one
+                if similarity >= best_similarity and (accept is None or accept(value)):
+                    best_similarity = similarity
+                    best_value = value
+            if best_value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return best_value
+
+    def put(self, vector: dict[str, float], value: T) -> None:
+        if not self._capacity:
+            return
+        signature = self._signature(vector)
+        with self._lock:
+            if len(self._entries) >= self._capacity:
+                self._evict(next(iter(self._entries)))
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (vector, signature, value)
+            for table, key in zip(self._buckets, signature):
+                table.setdefault(key, set()).add(entry_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            for table in self._buckets:
+                table.clear()
+
+    def _evict(self, entry_id: int) -> None:
+        _, signature, _ = self._entries.pop(entry_id)
+        for table, key in zip(self._buckets, signature):
+            bucket = table[key]
+            bucket.discard(entry_id)
+            if not bucket:
+                del table[key]
+
+    def _signature(self, vector: dict[str, float]) -> tuple[int, ...]:
+        # random-projection LSH: one bit per hyperplane, `bits` planes per table
+        size = self._tables * self._bits
+        sums = np.zeros(size, dtype=np.float32)
+        for token, weight in vector.items():
+            sums += np.float32(weight) * _token_projection(token, size)
+        planes = (sums > 0).reshape(self._tables, self._bits)
+        weights = 1 << np.arange(self._bits - 1, -1, -1, dtype=np.int64)
+        return tuple(int(key) for key in planes @ weights)
+
+
+@lru_cache(maxsize=_PROJECTION_CACHE_SIZE)
+def _token_projection(token: str, size: int) -> np.ndarray:
+    # a str seed is hashed deterministically, so every process draws the same planes
+    rng = random.Random(token)
+    projection = np.array([rng.gauss(0.0, 1.0) for _ in range(size)], dtype=np.float32)
+    projection.setflags(write=False)
+    return projection
+
+
+def _cosine(left: dict[str, float], right: dict[str, float]) -> float:
+    # both vectors are L2-normalized, so the dot product is the cosine
+    if len(left) > len(right):
+        left, right = right, left
+    return sum(weight * right.get(token, 0.0) for token, weight in left.items())
@@ -0,0 +1,17 @@
+import os
+from pathlib import Path
+
+KNOWLEDGE_SUFFIXES = frozenset({".md", ".txt"})
+
+
+def list_knowledge_files(root: Path) -> list[Path]:
+    # filter on the bare name: other entries never become Paths or get stat'ed
+    paths: list[Path] = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if os.path.splitext(name)[1].lower() not in KNOWLEDGE_SUFFIXES:
+                continue
+            path = Path(dirpath, name)
+            if path.is_file():
+                paths.append(path)
+    return sorted(paths)
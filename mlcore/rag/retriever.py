@@ -1,11 +1,27 @@
+import logging
 import math
+import os
+import pickle
 import re
+import threading
+from collections import Counter
 from dataclasses import dataclass
+from itertools import repeat
 from pathlib import Path
 from typing import Optional
 
+import numpy as np
+from cachetools import LRUCache
+
+from mlcore.rag.cache import ProximityCache
+from mlcore.rag.knowledge_files import list_knowledge_files
+
+logger = logging.getLogger(__name__)
 
 _TOKEN_RE = re.compile(r"[A-Za-zА-Яа-яЁё0-9]+", re.UNICODE)
+_INDEX_FORMAT_VERSION = 3
+
+_Postings = tuple[np.ndarray, np.ndarray, np.ndarray]
 
 
 @dataclass(frozen=True)
@@ -19,20 +35,46 @@ class RetrievedChunk:
 class Chunk:
     text: str
     source: str
-    tf: dict[str, int]
-    norm: float
 
 
 class KnowledgeRetriever:
-    def __init__(self, chunks: list[Chunk], idf: dict[str, float], top_k: int):
+    def __init__(
+        self,
+        chunks: list[Chunk],
+        idf: dict[str, float],
+        postings: _Postings,
+        top_k: int,
+        cache_size: int = 0,
+        cache_min_similarity: float = 1.0,
+    ):
         self._chunks = chunks
-        self._idf = idf
         self._top_k = top_k
+        self._vocab: dict[str, tuple[int, float]] = {
+            token: (col, weight) for col, (token, weight) in enumerate(idf.items())
+        }
+        self._col_ptr, self._posting_rows, self._posting_weights = postings
+        self._exact_cache: Optional[LRUCache[frozenset, tuple[int, list[RetrievedChunk]]]] = (
+            LRUCache(maxsize=cache_size) if cache_size > 0 else None
+        )
+        self._exact_cache_lock = threading.Lock()
+        self._exact_hits = 0
+        self._cache: ProximityCache[tuple[int, list[RetrievedChunk]]] = ProximityCache(
+            capacity=cache_size,
+            min_similarity=cache_min_similarity,
+        )
 
     @property
     def chunk_count(self) -> int:
         return len(self._chunks)
 
+    @property
+    def cache_hits(self) -> int:
+        return self._exact_hits + self._cache.hits
+
+    @property
+    def cache_misses(self) -> int:
+        return self._cache.misses
+
     @classmethod
     def from_directory(
         cls,
@@ -40,81 +82,239 @@ class KnowledgeRetriever:
         chunk_size_chars: int,
         chunk_overlap_chars: int,
         top_k: int,
+        cache_size: int = 0,
+        cache_min_similarity: float = 1.0,
+        index_file: str = "",
     ) -> "KnowledgeRetriever":
         root = Path(knowledge_dir)
         if not root.exists():
-            return cls(chunks=[], idf={}, top_k=top_k)
-
-        raw_chunks: list[tuple[str, str]] = []
-        for path in sorted(root.rglob("*")):
-            if not path.is_file():
-                continue
-            if path.suffix.lower() not in {".md", ".txt"}:
-                continue
-            text = path.read_text(encoding="utf-8", errors="ignore")
-            source = str(path.relative_to(root))
-            for piece in _split_text(text, chunk_size_chars, chunk_overlap_chars):
-                raw_chunks.append((piece, source))
+            return cls(chunks=[], idf={}, postings=_build_postings([], {}), top_k=top_k)
+
+        paths = list_knowledge_files(root)
+        fingerprint: tuple = ()
+        if index_file:
+            fingerprint = _index_fingerprint(root, paths, chunk_size_chars, chunk_overlap_chars)
+            stored = _load_index(index_file, fingerprint)
+            if stored is not None:
+                chunks, idf, postings = stored
+                return cls(
+                    chunks=chunks,
+                    idf=idf,
+                    postings=postings,
+                    top_k=top_k,
+                    cache_size=cache_size,
+                    cache_min_similarity=cache_min_similarity,
+                )
+
+        per_file = map(
+            _tokenize_file,
+            paths,
+            repeat(root),
+            repeat(chunk_size_chars),
+            repeat(chunk_overlap_chars),
+        )
+        raw_chunks = [chunk for file_chunks in per_file for chunk in file_chunks]
 
         if not raw_chunks:
-            return cls(chunks=[], idf={}, top_k=top_k)
+            return cls(chunks=[], idf={}, postings=_build_postings([], {}), top_k=top_k)
 
-        tokenized_chunks: list[dict[str, int]] = []
-        doc_freq: dict[str, int] = {}
-        for text, _ in raw_chunks:
-            tf = _term_frequency(text)
-            tokenized_chunks.append(tf)
-            for token in tf.keys():
-                doc_freq[token] = doc_freq.get(token, 0) + 1
+        doc_freq: Counter[str] = Counter()
+        for _, _, tf in raw_chunks:
+            doc_freq.update(tf.keys())
 
         docs_count = len(raw_chunks)
         idf = {
             token: math.log((1 + docs_count) / (1 + freq)) + 1.0
             for token, freq in doc_freq.items()
         }
-        chunks: list[Chunk] = []
-        for (text, source), tf in zip(raw_chunks, tokenized_chunks):
-            norm_sq = 0.0
-            for token, freq in tf.items():
-                weight = freq * idf.get(token, 0.0)
-                norm_sq += weight * weight
-            norm = math.sqrt(norm_sq) if norm_sq > 0 else 1.0
-            chunks.append(Chunk(text=text, source=source, tf=tf, norm=norm))
-
-        return cls(chunks=chunks, idf=idf, top_k=top_k)
+        chunks = [Chunk(text=text, source=source) for text, source, _ in raw_chunks]
+        postings = _build_postings([tf for _, _, tf in raw_chunks], idf)
+        if index_file:
+            _save_index(index_file, fingerprint, chunks, idf, postings)
+        return cls(
+            chunks=chunks,
+            idf=idf,
+            postings=postings,
+            top_k=top_k,
+            cache_size=cache_size,
+            cache_min_similarity=cache_min_similarity,
+        )
 
     def retrieve(self, query: str, top_k: Optional[int] = None) -> list[RetrievedChunk]:
         if not self._chunks:
             return []
+        limit = max(self._top_k if top_k is None else top_k, 0)
+        if not limit:
+            return []
         q_tf = _term_frequency(query)
-        if not q_tf:
+        exact_key = frozenset(q_tf.items())
+        exact = self._lookup_exact(exact_key, limit)
+        if exact is not None:
+            return exact
+
+        q_vector, q_columns = self._query_vector(q_tf)
+        if not q_vector:
             return []
+        cached = self._cache.get(q_vector)
+        if cached is not None and cached[0] >= limit:
+            self._remember_exact(exact_key, cached)
+            return cached[1][:limit]
+
+        scores = np.zeros(len(self._chunks), dtype=np.float32)
+        for col, q_weight in zip(q_columns, q_vector.values()):
+            start, end = self._col_ptr[col], self._col_ptr[col + 1]
+            weights = self._posting_weights[start:end].astype(np.float32)
+            scores[self._posting_rows[start:end]] += q_weight * weights
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+            candidates = candidates[top]
+        order = candidates[np.lexsort((candidates, -scores[candidates]))]
+        result = [
+            RetrievedChunk(
+                text=self._chunks[idx].text,
+                source=self._chunks[idx].source,
+                score=float(scores[idx]),
+            )
+            for idx in order.tolist()
+        ]
+        self._cache.put(q_vector, (limit, result))
+        self._remember_exact(exact_key, (limit, result))
+        return result
+
+    def cached(self, query: str, top_k: Optional[int] = None) -> Optional[list[RetrievedChunk]]:
+        limit = max(self._top_k if top_k is None else top_k, 0)
+        if not self._chunks or not limit:
+            return None
+        return self._lookup_exact(frozenset(_term_frequency(query).items()), limit)
 
-        q_norm_sq = 0.0
+    def embed(self, query: str) -> dict[str, float]:
+        q_vector, _ = self._query_vector(_term_frequency(query))
+        return q_vector
+
+    def exact_terms(self, query: str) -> frozenset[str]:
+        return frozenset(
+            token
+            for token in _term_frequency(query)
+            if token not in self._vocab or not token.isalpha()
+        )
+
+    def _lookup_exact(self, key: frozenset, limit: int) -> Optional[list[RetrievedChunk]]:
+        if self._exact_cache is None:
+            return None
+        with self._exact_cache_lock:
+            cached = self._exact_cache.get(key)
+            if cached is None or cached[0] < limit:
+                return None
+            self._exact_hits += 1
+            return cached[1][:limit]
+
+    def _remember_exact(self, key: frozenset, entry: tuple[int, list[RetrievedChunk]]) -> None:
+        if self._exact_cache is not None:
+            with self._exact_cache_lock:
+                self._exact_cache[key] = entry
+
+    def _query_vector(self, q_tf: dict[str, int]) -> tuple[dict[str, float], list[int]]:
+        weights: dict[str, float] = {}
+        columns: list[int] = []
         for token, freq in q_tf.items():
-            weight = freq * self._idf.get(token, 0.0)
-            q_norm_sq += weight * weight
-        q_norm = math.sqrt(q_norm_sq) if q_norm_sq > 0 else 1.0
-
-        ranked: list[RetrievedChunk] = []
-        for chunk in self._chunks:
-            dot = 0.0
-            for token, q_freq in q_tf.items():
-                idf = self._idf.get(token)
-                if idf is None:
-                    continue
-                c_freq = chunk.tf.get(token, 0)
-                if c_freq == 0:
-                    continue
-                dot += (q_freq * idf) * (c_freq * idf)
-            if dot <= 0:
-                continue
-            score = dot / (q_norm * chunk.norm)
-            ranked.append(RetrievedChunk(text=chunk.text, source=chunk.source, score=score))
-
-        ranked.sort(key=lambda x: x.score, reverse=True)
-        limit = self._top_k if top_k is None else top_k
-        return ranked[: max(limit, 0)]
+            entry = self._vocab.get(token)
+            if entry is not None:
+                columns.append(entry[0])
+                weights[token] = freq * entry[1]
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        if norm <= 0:
+            return {}, []
+        return {token: weight / norm for token, weight in weights.items()}, columns
+
+
+def _build_postings(term_freqs: list[dict[str, int]], idf: dict[str, float]) -> _Postings:
+    columns = {token: col for col, token in enumerate(idf)}
+    row_ids: list[int] = []
+    col_ids: list[int] = []
+    weights: list[float] = []
+    for row, tf in enumerate(term_freqs):
+        row_weights = [freq * idf[token] for token, freq in tf.items()]
+        norm = math.sqrt(sum(weight * weight for weight in row_weights)) or 1.0
+        row_ids.extend([row] * len(tf))
+        col_ids.extend(columns[token] for token in tf)
+        weights.extend(weight / norm for weight in row_weights)
+
+    cols = np.asarray(col_ids, dtype=np.intp)
+    order = np.argsort(cols, kind="stable")
+    col_ptr = np.zeros(len(idf) + 1, dtype=np.intp)
+    np.cumsum(np.bincount(cols, minlength=len(idf)), out=col_ptr[1:])
+    return (
+        col_ptr,
+        np.asarray(row_ids, dtype=np.int32)[order],
+        np.asarray(weights, dtype=np.float16)[order],
+    )
+
+
+def _index_fingerprint(
+    root: Path,
+    paths: list[Path],
+    chunk_size_chars: int,
+    chunk_overlap_chars: int,
+) -> tuple:
+    files = []
+    for path in paths:
+        stat = path.stat()
+        files.append((str(path.relative_to(root)), stat.st_mtime_ns, stat.st_size))
+    return (_INDEX_FORMAT_VERSION, chunk_size_chars, chunk_overlap_chars, tuple(files))
+
+
+def _load_index(
+    index_file: str,
+    fingerprint: tuple,
+) -> Optional[tuple[list[Chunk], dict[str, float], _Postings]]:
+    try:
+        with open(index_file, "rb") as handle:
+            stored_fingerprint, chunks, idf, postings = pickle.load(handle)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.warning("Cannot load RAG index %s, rebuilding it", index_file, exc_info=True)
+        return None
+    if stored_fingerprint != fingerprint:
+        return None
+    return chunks, idf, postings
+
+
+def _save_index(
+    index_file: str,
+    fingerprint: tuple,
+    chunks: list[Chunk],
+    idf: dict[str, float],
+    postings: _Postings,
+) -> None:
+    path = Path(index_file)
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "wb") as handle:
+            pickle.dump(
+                (fingerprint, chunks, idf, postings),
+                handle,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_path, path)
+    except OSError:
+        return
+
+
+def _tokenize_file(
+    path: Path,
+    root: Path,
+    chunk_size_chars: int,
+    chunk_overlap_chars: int,
+) -> list[tuple[str, str, dict[str, int]]]:
+    text = path.read_text(encoding="utf-8", errors="ignore")
+    source = str(path.relative_to(root))
+    return [
+        (piece, source, _term_frequency(piece))
+        for piece in _split_text(text, chunk_size_chars, chunk_overlap_chars)
+    ]
 
 
 def _split_text(text: str, chunk_size_chars: int, chunk_overlap_chars: int) -> list[str]:
@@ -139,7 +339,4 @@ def _split_text(text: str, chunk_size_chars: int, chunk_overlap_chars: int) -> l
 
 
 def _term_frequency(text: str) -> dict[str, int]:
-    tf: dict[str, int] = {}
-    for token in _TOKEN_RE.findall(text.lower()):
-        tf[token] = tf.get(token, 0) + 1
-    return tf
+    return Counter(_TOKEN_RE.findall(text.lower()))
@@ -1,17 +1,27 @@
+import asyncio
 import html
+import logging
+import re
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Sequence
 from contextlib import suppress
+from functools import lru_cache, partial
 from typing import Optional
 
 from aiogram import F, Router
+from cachetools import TTLCache
 from aiogram.filters import CommandStart
-from aiogram.exceptions import TelegramBadRequest
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest
 from aiogram.types import CallbackQuery, Message
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.types import KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove
 
 from mlcore.llm_client import LLMApiError
 from mlcore.rag.retriever import RetrievedChunk
+from supportbot.telegram.semantic_cache import SemanticAnswerCache
 from core.runtime import (
+    get_faq_answers,
     get_knowledge_retriever,
     get_llm_client,
     get_rag_min_relevance_score,
@@ -19,59 +29,100 @@ from core.runtime import (
 )
 
 router = Router()
-_started_users: set[int] = set()
-_chat_history_by_user: dict[int, list[dict[str, str]]] = {}
+logger = logging.getLogger(__name__)
+_MAX_CHAT_USERS = 200_000
+_STARTED_TTL_SECONDS = 24 * 3600
+_HISTORY_TTL_SECONDS = 3600
+_started_users: TTLCache[int, bool] = TTLCache(
+    maxsize=_MAX_CHAT_USERS, ttl=_STARTED_TTL_SECONDS
+)
+_chat_history_by_user: TTLCache[int, deque[tuple[str, str]]] = TTLCache(
+    maxsize=_MAX_CHAT_USERS, ttl=_HISTORY_TTL_SECONDS
+)
 _MAX_HISTORY_ITEMS = 10
+_FAQ_CALLBACK_PREFIX = "support:faq:"
+_STREAM_EDIT_INTERVAL_SECONDS = 1.0
+_MAX_MESSAGE_CHARS = 4096
+_ANSWER_TTL_SECONDS = 3600
+_answer_cache = SemanticAnswerCache(ttl_seconds=_ANSWER_TTL_SECONDS)
+_inflight_answers: dict[tuple, asyncio.Task[str]] = {}
+_background_tasks: set[asyncio.Task[None]] = set()
+_BANNED_MARKERS = (
+    "в представленном контексте отсутствует",
+    "информация в контексте отсутствует",
+    "в контексте нет",
+    "в базе знаний нет",
+    "rag",
+    "retrieval",
+    "контекст",
+)
+_UNCERTAINTY_MARKERS = (
+    "не могу дать точный ответ",
+    "не могу точно ответить",
+    "недостаточно данных",
+    "нужна помощь оператора",
+    "рекомендую передать вопрос оператору",
+    "выходит за рамки нашей поддержки",
+)
+_ANSWER_MARKERS_RE = re.compile(
+    f"(?P<banned>{'|'.join(map(re.escape, _BANNED_MARKERS))})"
+    f"|(?P<uncertain>{'|'.join(map(re.escape, _UNCERTAINTY_MARKERS))})"
+)
 
-
-def _main_keyboard() -> ReplyKeyboardMarkup:
-    return ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text="FAQ")]],
-        resize_keyboard=True,
-    )
-
-
-def _dialog_keyboard() -> ReplyKeyboardMarkup:
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="У меня новый вопрос")],
-        ],
-        resize_keyboard=True,
-    )
+_MAIN_KEYBOARD = ReplyKeyboardMarkup(
+    keyboard=[[KeyboardButton(text="FAQ")]],
+    resize_keyboard=True,
+)
+_DIALOG_KEYBOARD = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="У меня новый вопрос")],
+    ],
+    resize_keyboard=True,
+)
+_OPERATOR_KEYBOARD = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="Перевести на оператора")],
+        [KeyboardButton(text="У меня новый вопрос")],
+    ],
+    resize_keyboard=True,
+)
 
 
-def _operator_keyboard() -> ReplyKeyboardMarkup:
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="Перевести на оператора")],
-            [KeyboardButton(text="У меня новый вопрос")],
-        ],
-        resize_keyboard=True,
-    )
+def _faq_keyboard(questions: list[str]) -> Optional[InlineKeyboardMarkup]:
+    return _faq_keyboard_for(tuple(questions))
 
 
-def _faq_keyboard(questions: list[str]) -> Optional[InlineKeyboardMarkup]:
+@lru_cache(maxsize=8)
+def _faq_keyboard_for(questions: tuple[str, ...]) -> Optional[InlineKeyboardMarkup]:
     if not questions:
         return None
     rows = [
-        [InlineKeyboardButton(text=q[:64], callback_data=f"support:faq:{i}")]
+        [InlineKeyboardButton(text=q[:64], callback_data=f"{_FAQ_CALLBACK_PREFIX}{i}")]
         for i, q in enumerate(questions)
     ]
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
+@lru_cache(maxsize=8)
+def _faq_callback_table(questions: tuple[str, ...]) -> dict[str, tuple[int, str, str]]:
+    return {
+        f"{_FAQ_CALLBACK_PREFIX}{i}": (i, q, html.escape(q))
+        for i, q in enumerate(questions)
+    }
+
+
 @router.message(CommandStart())
 async def start_handler(message: Message) -> None:
     if message.from_user is None:
         return
 
     user_id = message.from_user.id
-    _started_users.add(user_id)
+    _started_users[user_id] = True
     _reset_dialog(user_id)
 
     await message.answer(
         "Здравствуйте! Чем могу помочь?",
-        reply_markup=_main_keyboard(),
+        reply_markup=_MAIN_KEYBOARD,
     )
 
 
@@ -79,7 +130,7 @@ async def start_handler(message: Message) -> None:
 async def faq_menu_handler(message: Message) -> None:
     if message.from_user is None:
         return
-    if message.from_user.id not in _started_users:
+    if not _is_started(message.from_user.id):
         await message.answer("Начните диалог командой /start.")
         return
 
@@ -98,14 +149,14 @@ async def faq_menu_handler(message: Message) -> None:
 async def back_handler(message: Message) -> None:
     if message.from_user is None:
         return
-    if message.from_user.id not in _started_users:
+    if not _is_started(message.from_user.id):
         await message.answer("Начните диалог командой /start.")
         return
 
     _reset_dialog(message.from_user.id)
     await message.answer(
         "Начнем заново. Чем могу помочь?",
-        reply_markup=_main_keyboard(),
+        reply_markup=_MAIN_KEYBOARD,
     )
 
 
@@ -113,47 +164,49 @@ async def back_handler(message: Message) -> None:
 async def transfer_to_operator_handler(message: Message) -> None:
     if message.from_user is None:
         return
-    if message.from_user.id not in _started_users:
+    if not _is_started(message.from_user.id):
         await message.answer("Начните диалог командой /start.")
         return
 
     await message.answer(
         "Передаю ваш запрос оператору. Пожалуйста, ожидайте ответ в чате.",
-        reply_markup=_dialog_keyboard(),
+        reply_markup=_DIALOG_KEYBOARD,
     )
 
 
-@router.callback_query(F.data.startswith("support:faq:"))
+@router.callback_query(F.data.startswith(_FAQ_CALLBACK_PREFIX))
 async def support_faq_callback(callback: CallbackQuery) -> None:
     if callback.message is None:
         await callback.answer()
         return
 
     user_id = callback.from_user.id
-    if user_id not in _started_users:
+    if not _is_started(user_id):
         await callback.answer("Сначала отправьте /start.", show_alert=True)
         return
 
-    try:
-        idx = int(callback.data.split(":")[-1])
-    except ValueError:
+    entry = _faq_callback_table(tuple(get_start_questions())).get(callback.data)
+    if entry is None:
         await callback.answer()
         return
-
-    questions = get_start_questions()
-    if idx < 0 or idx >= len(questions):
-        await callback.answer()
-        return
-
-    await callback.answer()
-    await callback.message.answer(
-        f"Вопрос: {html.escape(questions[idx])}",
-        reply_markup=_dialog_keyboard(),
+    idx, question, escaped_question = entry
+
+    await asyncio.gather(
+        callback.answer(),
+        callback.message.answer(
+            f"Вопрос: {escaped_question}",
+            reply_markup=_DIALOG_KEYBOARD,
+        ),
     )
+    precomputed = get_faq_answers().get(idx)
+    if precomputed is not None:
+        answer, needs_operator = precomputed
+        await _reply_with_answer(callback.message, user_id, question, answer, needs_operator)
+        return
     await _answer_with_rag(
         message=callback.message,
         user_id=user_id,
-        question_text=questions[idx],
+        question_text=question,
         with_progress=True,
     )
 
@@ -164,7 +217,7 @@ async def support_question_handler(message: Message) -> None:
         return
 
     user_id = message.from_user.id
-    if user_id not in _started_users:
+    if not _is_started(user_id):
         await message.answer("Начните диалог командой /start.")
         return
 
@@ -182,50 +235,179 @@ async def _answer_with_rag(
     question_text: str,
     with_progress: bool = False,
 ) -> None:
-    progress_message: Optional[Message] = None
+    progress_task: Optional[asyncio.Task[Message]] = None
     if with_progress:
-        progress_message = await message.answer("Понял, сейчас проверю.")
+        progress_task = asyncio.create_task(message.answer("Понял, сейчас проверю."))
 
-    llm_client = get_llm_client()
-    retriever = get_knowledge_retriever()
-    chunks = retriever.retrieve(question_text)
-    context = _build_context(chunks)
-    top_score = chunks[0].score if chunks else 0.0
-    is_low_relevance = top_score < get_rag_min_relevance_score()
-    history = _chat_history_by_user.get(user_id, [])
+    history = _chat_history_by_user.get(user_id, ())
+    on_partial = _progress_streamer(progress_task) if progress_task is not None else None
     try:
-        answer = await llm_client.ask(question_text, context=context, chat_history=history)
+        clean_answer, needs_operator = await _ask_with_rag(
+            question_text, history, on_partial=on_partial
+        )
     except LLMApiError as exc:
-        await _cleanup_progress(progress_message)
+        _cleanup_progress_later(progress_task)
         safe_error = html.escape(str(exc))
         await message.answer(f"Ошибка LLM API: {safe_error}")
         return
     except Exception:
-        await _cleanup_progress(progress_message)
+        _cleanup_progress_later(progress_task)
         await message.answer("Не удалось получить ответ от LLM API.")
         return
 
-    await _cleanup_progress(progress_message)
-    clean_answer, needs_operator = _sanitize_customer_answer(
+    _cleanup_progress_later(progress_task)
+    await _reply_with_answer(message, user_id, question_text, clean_answer, needs_operator)
+
+
+def _progress_streamer(
+    progress_task: asyncio.Task[Message],
+) -> Callable[[str], Awaitable[None]]:
+    latest = ""
+    last_edit = 0.0
+    stopped = False
+    edit_task: Optional[asyncio.Task[None]] = None
+
+    async def edit_preview() -> None:
+        with suppress(TelegramAPIError):
+            progress_message = await progress_task
+            await progress_message.edit_text(latest[:_MAX_MESSAGE_CHARS], parse_mode=None)
+
+    async def on_partial(text: str) -> None:
+        nonlocal latest, last_edit, stopped, edit_task
+        if stopped:
+            return
+        if any(m.lastgroup == "banned" for m in _ANSWER_MARKERS_RE.finditer(text.lower())):
+            stopped = True
+            return
+        latest = text
+        now = time.monotonic()
+        if now - last_edit < _STREAM_EDIT_INTERVAL_SECONDS:
+            return
+        if edit_task is not None and not edit_task.done():
+            return
+        last_edit = now
+        edit_task = asyncio.create_task(edit_preview())
+        _background_tasks.add(edit_task)
+        edit_task.add_done_callback(_on_background_task_done)
+
+    return on_partial
+
+
+async def warmup() -> None:
+    await asyncio.gather(
+        asyncio.to_thread(get_knowledge_retriever().retrieve, "доставка"),
+        get_llm_client().warmup(),
+    )
+
+
+async def precompute_faq_answers(questions: list[str]) -> TTLCache[int, tuple[str, bool]]:
+    results = await asyncio.gather(
+        *(_ask_with_rag(question, ()) for question in questions),
+        return_exceptions=True,
+    )
+    answers: TTLCache[int, tuple[str, bool]] = TTLCache(
+        maxsize=max(len(questions), 1), ttl=_ANSWER_TTL_SECONDS
+    )
+    for idx, result in enumerate(results):
+        if not isinstance(result, BaseException) and not result[1]:
+            answers[idx] = result
+    return answers
+
+
+async def _ask_with_rag(
+    question_text: str,
+    history: Sequence[tuple[str, str]],
+    on_partial: Optional[Callable[[str], Awaitable[None]]] = None,
+) -> tuple[str, bool]:
+    retriever = get_knowledge_retriever()
+    chunks = retriever.cached(question_text)
+    if chunks is None:
+        chunks = await asyncio.to_thread(retriever.retrieve, question_text)
+    q_vector = {} if history else retriever.embed(question_text)
+    q_terms = retriever.exact_terms(question_text)
+    cached = _answer_cache.get(q_vector, q_terms, chunks)
+    if cached is not None:
+        return cached
+
+    context = _build_context(chunks)
+    top_score = chunks[0].score if chunks else 0.0
+    is_low_relevance = top_score < get_rag_min_relevance_score()
+    if not chunks or is_low_relevance:
+        on_partial = None
+    answer = await _ask_llm_coalesced(question_text, context, history, on_partial)
+    result = _sanitize_customer_answer(
         answer,
         chunks_found=len(chunks) > 0,
         low_relevance=is_low_relevance,
     )
+    if not result[1]:
+        _answer_cache.put(q_vector, q_terms, chunks, result)
+    return result
+
+
+async def _ask_llm_coalesced(
+    question_text: str,
+    context: str,
+    history: Sequence[tuple[str, str]],
+    on_partial: Optional[Callable[[str], Awaitable[None]]] = None,
+) -> str:
+    dialog = tuple(history)
+    key = (question_text, context, dialog)
+    task = _inflight_answers.get(key)
+    if task is None:
+        if on_partial is None:
+            request = get_llm_client().ask(
+                question_text, context=context, chat_history=dialog
+            )
+        else:
+            request = _stream_llm_answer(question_text, context, dialog, on_partial)
+        task = asyncio.create_task(request)
+        _inflight_answers[key] = task
+        task.add_done_callback(partial(_forget_inflight_answer, key))
+    return await asyncio.shield(task)
+
+
+async def _stream_llm_answer(
+    question_text: str,
+    context: str,
+    history: Sequence[tuple[str, str]],
+    on_partial: Callable[[str], Awaitable[None]],
+) -> str:
+    parts: list[str] = []
+    stream = get_llm_client().ask_stream(question_text, context=context, chat_history=history)
+    async for delta in stream:
+        parts.append(delta)
+        await on_partial("".join(parts))
+    answer = "".join(parts).strip()
+    if not answer:
+        raise LLMApiError("LLM API returned empty answer.")
+    return answer
+
+
+def _forget_inflight_answer(key: tuple, task: asyncio.Task[str]) -> None:
+    _inflight_answers.pop(key, None)
+    if not task.cancelled():
+        task.exception()
+
+
+async def _reply_with_answer(
+    message: Message,
+    user_id: int,
+    question_text: str,
+    answer: str,
+    needs_operator: bool,
+) -> None:
     _append_history(user_id, "user", question_text)
-    _append_history(user_id, "assistant", clean_answer)
-    reply_keyboard = _operator_keyboard() if needs_operator else _dialog_keyboard()
-    await message.answer(clean_answer, reply_markup=reply_keyboard)
+    _append_history(user_id, "assistant", answer)
+    reply_keyboard = _OPERATOR_KEYBOARD if needs_operator else _DIALOG_KEYBOARD
+    await message.answer(answer, reply_markup=reply_keyboard)
 
 
 def _build_context(chunks: list[RetrievedChunk]) -> str:
-    if not chunks:
-        return ""
-    lines: list[str] = []
-    for idx, chunk in enumerate(chunks, start=1):
-        lines.append(f"[Источник {idx}: {chunk.source}]")
-        lines.append(chunk.text)
-        lines.append("")
-    return "\n".join(lines).strip()
+    return "\n\n".join(
+        f"[Источник {idx}: {chunk.source}]\n{chunk.text}"
+        for idx, chunk in enumerate(chunks, start=1)
+    )
 
 
 def _sanitize_customer_answer(
@@ -235,30 +417,16 @@ def _sanitize_customer_answer(
 ) -> tuple[str, bool]:
     text = answer.strip()
     lowered = text.lower()
-    banned_markers = [
-        "в представленном контексте отсутствует",
-        "информация в контексте отсутствует",
-        "в контексте нет",
-        "в базе знаний нет",
-        "rag",
-        "retrieval",
-        "контекст",
-    ]
-    uncertainty_markers = [
-        "не могу дать точный ответ",
-        "не могу точно ответить",
-        "недостаточно данных",
-        "нужна помощь оператора",
-        "рекомендую передать вопрос оператору",
-        "выходит за рамки нашей поддержки",
-    ]
-    if any(marker in lowered for marker in banned_markers):
-        return (
-            "Сейчас не могу дать точный ответ по этому вопросу. "
-            "Нажмите кнопку «Перевести на оператора», и мы подключим специалиста.",
-            True,
-        )
-    if any(marker in lowered for marker in uncertainty_markers):
+    uncertain = False
+    for match in _ANSWER_MARKERS_RE.finditer(lowered):
+        if match.lastgroup == "banned":
+            return (
+                "Сейчас не могу дать точный ответ по этому вопросу. "
+                "Нажмите кнопку «Перевести на оператора», и мы подключим специалиста.",
+                True,
+            )
+        uncertain = True
+    if uncertain:
         return text, True
     if not chunks_found or low_relevance:
         return (
@@ -269,19 +437,42 @@ def _sanitize_customer_answer(
     return text, False
 
 
+def _is_started(user_id: int) -> bool:
+    if user_id not in _started_users:
+        return False
+    _started_users[user_id] = True
+    return True
+
+
 def _reset_dialog(user_id: int) -> None:
-    _chat_history_by_user[user_id] = []
+    _chat_history_by_user[user_id] = deque(maxlen=_MAX_HISTORY_ITEMS)
 
 
 def _append_history(user_id: int, role: str, content: str) -> None:
-    history = _chat_history_by_user.setdefault(user_id, [])
-    history.append({"role": role, "content": content})
-    if len(history) > _MAX_HISTORY_ITEMS:
-        _chat_history_by_user[user_id] = history[-_MAX_HISTORY_ITEMS:]
+    history = _chat_history_by_user.get(user_id)
+    if history is None:
+        history = deque(maxlen=_MAX_HISTORY_ITEMS)
+    _chat_history_by_user[user_id] = history
+    history.append((role, content))
+
+
+def _cleanup_progress_later(progress_task: Optional[asyncio.Task[Message]]) -> None:
+    if progress_task is None:
+        return
+    task = asyncio.create_task(_cleanup_progress(progress_task))
+    _background_tasks.add(task)
+    task.add_done_callback(_on_background_task_done)
+
+
+def _on_background_task_done(task: asyncio.Task[None]) -> None:
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Progress message update failed", exc_info=task.exception())
 
 
-async def _cleanup_progress(progress_message: Optional[Message]) -> None:
-    if progress_message is None:
+async def _cleanup_progress(progress_task: Optional[asyncio.Task[Message]]) -> None:
+    if progress_task is None:
         return
+    progress_message = await progress_task
     with suppress(TelegramBadRequest):
         await progress_message.delete()
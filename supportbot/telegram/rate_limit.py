@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramAPIError
+from aiogram.methods import DeleteMessage, EditMessageText, SendMessage
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+# telegram rejects bots sending more than about 30 messages per second overall
+_DEFAULT_PER_SECOND = 30.0
+# only chat messages count against that limit; polling and callback acks pass through
+_PACED_METHODS = (SendMessage, EditMessageText, DeleteMessage)
+_DROPPABLE_METHODS = (EditMessageText,)
+
+
+class SendBacklogError(TelegramAPIError):
+    pass
+
+
+class SendRateLimiter(BaseRequestMiddleware):
+    def __init__(self, per_second: float = _DEFAULT_PER_SECOND):
+        self._interval = 1.0 / per_second
+        # monotonic time of the next free send slot
+        self._next_slot = 0.0
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if isinstance(method, _PACED_METHODS):
+            now = time.monotonic()
+            if isinstance(method, _DROPPABLE_METHODS) and self._next_slot > now:
+                raise SendBacklogError(method=method, message="Send queue is backlogged")
+            # leaky bucket: each call reserves the next slot, so a burst drains
+            # in FIFO order at a steady rate instead of hitting 429 retries
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+            if slot > now:
+                await asyncio.sleep(slot - now)
+        return await make_request(bot, method)
@@ -0,0 +1,78 @@
+import time
+from typing import Optional
+
+from mlcore.rag.cache import ProximityCache
+from mlcore.rag.retriever import RetrievedChunk
+
+_DEFAULT_CAPACITY = 1024
+_DEFAULT_MIN_SIMILARITY = 0.93
+_DEFAULT_MIN_CHUNK_OVERLAP = 0.6
+_DEFAULT_TTL_SECONDS = 3600.0
+
+_ChunkKeys = frozenset[tuple[str, str]]
+# (monotonic expiry, unindexed query terms, chunks the answer was grounded on, answer)
+_Entry = tuple[float, frozenset[str], _ChunkKeys, tuple[str, bool]]
+
+
+class SemanticAnswerCache:
+    def __init__(
+        self,
+        capacity: int = _DEFAULT_CAPACITY,
+        min_similarity: float = _DEFAULT_MIN_SIMILARITY,
+        min_chunk_overlap: float = _DEFAULT_MIN_CHUNK_OVERLAP,
+        ttl_seconds: float = _DEFAULT_TTL_SECONDS,
+    ):
+        self._min_chunk_overlap = min_chunk_overlap
+        self._ttl_seconds = ttl_seconds
+        self._entries: ProximityCache[_Entry] = ProximityCache(
+            capacity=capacity, min_similarity=min_similarity
+        )
+
+    def get(
+        self,
+        vector: dict[str, float],
+        exact_terms: frozenset[str],
+        chunks: list[RetrievedChunk],
+    ) -> Optional[tuple[str, bool]]:
+        if not vector:
+            return None
+        now = time.monotonic()
+        current_keys = _chunk_keys(chunks)
+
+        def usable(entry: _Entry) -> bool:
+            expires_at, entry_terms, chunk_keys, _ = entry
+            # order numbers, names and other unindexed words must match exactly;
+            # the vector cannot tell them apart
+            return (
+                expires_at > now
+                and entry_terms == exact_terms
+                and _jaccard(chunk_keys, current_keys) >= self._min_chunk_overlap
+            )
+
+        entry = self._entries.get(vector, accept=usable)
+        if entry is None:
+            return None
+        return entry[3]
+
+    def put(
+        self,
+        vector: dict[str, float],
+        exact_terms: frozenset[str],
+        chunks: list[RetrievedChunk],
+        answer: tuple[str, bool],
+    ) -> None:
+        if not vector:
+            return
+        expires_at = time.monotonic() + self._ttl_seconds
+        self._entries.put(vector, (expires_at, exact_terms, _chunk_keys(chunks), answer))
+
+
+def _chunk_keys(chunks: list[RetrievedChunk]) -> _ChunkKeys:
+    return frozenset((chunk.source, chunk.text) for chunk in chunks)
+
+
+def _jaccard(left: _ChunkKeys, right: _ChunkKeys) -> float:
+    union = len(left | right)
+    if not union:
+        return 1.0
+    return len(left & right) / union
@@ -0,0 +1,174 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from aiogram.exceptions import TelegramNetworkError
+from aiogram.methods import SendMessage
+
+from core import runtime
+from mlcore.rag.retriever import RetrievedChunk
+from supportbot.telegram import handlers
+from supportbot.telegram.semantic_cache import SemanticAnswerCache
+
+
+class _FakeMessage:
+    def __init__(self, log: list, text: str = ""):
+        self._log = log
+        self.text = text
+
+    async def answer(self, text: str, **kwargs) -> "_FakeMessage":
+        await asyncio.sleep(0)
+        self._log.append(("send", text))
+        return _FakeMessage(self._log, text)
+
+    async def edit_text(self, text: str, **kwargs) -> "_FakeMessage":
+        self._log.append(("edit", text))
+        return self
+
+    async def delete(self) -> None:
+        self._log.append(("delete", self.text))
+
+
+class _FakeRetriever:
+    def __init__(self, score: float):
+        self._score = score
+
+    def cached(self, query: str) -> None:
+        return None
+
+    def retrieve(self, query: str) -> list[RetrievedChunk]:
+        return [RetrievedChunk(text="Доставка 3 дня.", source="faq.md", score=self._score)]
+
+    def embed(self, query: str) -> dict[str, float]:
+        return {"заказ": 1.0}
+
+    def exact_terms(self, query: str) -> frozenset[str]:
+        return frozenset(token for token in query.split() if token.isdigit())
+
+
+class _FakeLLMClient:
+    def __init__(self, parts: list[str]):
+        self._parts = parts
+
+    async def ask(self, user_text, context="", chat_history=None) -> str:
+        return "".join(self._parts)
+
+    async def ask_stream(self, user_text, context="", chat_history=None):
+        for part in self._parts:
+            await asyncio.sleep(0)
+            yield part
+
+
+class AnswerStreamingTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.log: list = []
+        runtime.set_llm_client(_FakeLLMClient(["Доставка ", "занимает ", "3 дня."]))
+        runtime.set_rag_min_relevance_score(0.12)
+        patches = [
+            mock.patch.object(handlers, "_STREAM_EDIT_INTERVAL_SECONDS", 0.0),
+            mock.patch.object(handlers, "_answer_cache", SemanticAnswerCache()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def _answer(self, message: _FakeMessage, question: str) -> None:
+        await handlers._answer_with_rag(message, 1, question, with_progress=True)
+        await asyncio.gather(*handlers._background_tasks)
+
+    async def test_relevant_answer_streams_into_placeholder(self) -> None:
+        runtime.set_knowledge_retriever(_FakeRetriever(score=0.9))
+        await self._answer(_FakeMessage(self.log), "сколько идет доставка")
+
+        edits = [text for kind, text in self.log if kind == "edit"]
+        self.assertEqual(edits[-1], "Доставка занимает 3 дня.")
+        self.assertIn(("send", "Доставка занимает 3 дня."), self.log)
+
+    async def test_low_relevance_answer_is_not_streamed(self) -> None:
+        runtime.set_knowledge_retriever(_FakeRetriever(score=0.01))
+        await self._answer(_FakeMessage(self.log), "как погода на марсе")
+
+        self.assertNotIn("edit", [kind for kind, _ in self.log])
+        sends = [text for kind, text in self.log if kind == "send"]
+        self.assertTrue(sends[-1].startswith("Уточните, пожалуйста"))
+
+    async def test_failed_placeholder_does_not_fail_answer(self) -> None:
+        runtime.set_knowledge_retriever(_FakeRetriever(score=0.9))
+        progress_failed = asyncio.get_running_loop().create_future()
+        progress_failed.set_exception(
+            TelegramNetworkError(SendMessage(chat_id=1, text=""), "send failed")
+        )
+        on_partial = handlers._progress_streamer(progress_failed)
+
+        answer = await handlers._ask_llm_coalesced("вопрос", "контекст", (), on_partial)
+        await asyncio.gather(*handlers._background_tasks)
+
+        self.assertEqual(answer, "Доставка занимает 3 дня.")
+
+    async def test_slow_preview_edit_does_not_block_stream(self) -> None:
+        release = asyncio.Event()
+        placeholder = _FakeMessage(self.log)
+
+        async def stalled_edit(text: str, **kwargs) -> _FakeMessage:
+            self.log.append(("edit", text))
+            await release.wait()
+            return placeholder
+
+        placeholder.edit_text = stalled_edit
+        progress_task = asyncio.create_task(asyncio.sleep(0, result=placeholder))
+        on_partial = handlers._progress_streamer(progress_task)
+
+        answer = await asyncio.wait_for(
+            handlers._ask_llm_coalesced("вопрос", "контекст", (), on_partial), timeout=1.0
+        )
+        release.set()
+        await asyncio.gather(*handlers._background_tasks)
+
+        self.assertEqual(answer, "Доставка занимает 3 дня.")
+        self.assertEqual(len([kind for kind, _ in self.log if kind == "edit"]), 1)
+
+
+class AnswerCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.llm = _FakeLLMClient(["Заказ 48213 в пути."])
+        runtime.set_llm_client(self.llm)
+        runtime.set_rag_min_relevance_score(0.12)
+        patch = mock.patch.object(handlers, "_answer_cache", SemanticAnswerCache())
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    async def test_order_number_is_part_of_the_key(self) -> None:
+        runtime.set_knowledge_retriever(_FakeRetriever(score=0.9))
+        first = await handlers._ask_with_rag("где мой заказ 48213", ())
+        self.llm._parts = ["Заказ 51177 доставлен."]
+        second = await handlers._ask_with_rag("где мой заказ 51177", ())
+
+        self.assertEqual(first, ("Заказ 48213 в пути.", False))
+        self.assertEqual(second, ("Заказ 51177 доставлен.", False))
+
+    async def test_fallback_answer_is_not_cached(self) -> None:
+        runtime.set_knowledge_retriever(_FakeRetriever(score=0.01))
+        fallback, needs_operator = await handlers._ask_with_rag("где мой заказ", ())
+        self.assertTrue(needs_operator)
+
+        runtime.set_knowledge_retriever(_FakeRetriever(score=0.9))
+        answer = await handlers._ask_with_rag("где мой заказ", ())
+
+        self.assertEqual(answer, ("Заказ 48213 в пути.", False))
+
+    async def test_precomputed_faq_answers_expire_with_the_cache(self) -> None:
+        runtime.set_knowledge_retriever(_FakeRetriever(score=0.9))
+        answers = await handlers.precompute_faq_answers(["где мой заказ"])
+
+        self.assertEqual(answers.get(0), ("Заказ 48213 в пути.", False))
+        self.assertEqual(answers.ttl, handlers._ANSWER_TTL_SECONDS)
+
+    async def test_precomputed_fallback_is_not_kept(self) -> None:
+        runtime.set_knowledge_retriever(_FakeRetriever(score=0.01))
+        answers = await handlers.precompute_faq_answers(["где мой заказ"])
+
+        self.assertIsNone(answers.get(0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+import yaml
+
+from core.flow import markdown_reader
+
+
+def _yaml_body(lines: list[str]):
+    return yaml.load("\n".join(lines), Loader=markdown_reader._YAML_LOADER)
+
+
+class BlockBodyFastPathTest(unittest.TestCase):
+    def test_common_layout_uses_fast_path(self) -> None:
+        lines = [
+            "type: menu",
+            "menu_id: main",
+            'text: "Выберите тему:"',
+            "rules:",
+            "  hide_on_next: false",
+            "buttons:",
+            "  - id: billing",
+            '    text: "Оплата"',
+            "    next: billing",
+        ]
+        payload = markdown_reader._parse_block_body(lines)
+        self.assertIsNotNone(payload)
+        self.assertEqual(payload, _yaml_body(lines))
+
+    def test_yaml_special_values_fall_back(self) -> None:
+        for value in ("=", "<<", "a: b", "x #y", "2024-01-01", ".inf", "*ref", '"a\\tb"'):
+            with self.subTest(value=value):
+                self.assertIsNone(markdown_reader._parse_block_body([f"next: {value}"]))
+
+    def test_yaml_special_keys_fall_back(self) -> None:
+        for key in ("on", "yes", "null", "False"):
+            with self.subTest(key=key):
+                self.assertIsNone(markdown_reader._parse_block_body([f"{key}: start"]))
+
+    def test_values_rejected_by_yaml_are_not_accepted(self) -> None:
+        for value in ("=", "<<"):
+            with self.subTest(value=value):
+                with self.assertRaises(yaml.YAMLError):
+                    _yaml_body([f"next: {value}"])
+                self.assertIsNone(markdown_reader._parse_block_body([f"next: {value}"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+from unittest import mock
+
+from aiogram.methods import EditMessageText, SendMessage
+
+from supportbot.telegram import rate_limit
+from supportbot.telegram.rate_limit import SendBacklogError, SendRateLimiter
+
+
+async def _make_request(bot, method):
+    return method
+
+
+class SendRateLimiterTest(unittest.IsolatedAsyncioTestCase):
+    async def test_preview_edit_is_dropped_when_backlogged(self) -> None:
+        limiter = SendRateLimiter(per_second=1.0)
+        edit = EditMessageText(chat_id=1, message_id=1, text="Доставка")
+        with mock.patch.object(rate_limit.time, "monotonic", return_value=100.0):
+            await limiter(_make_request, None, SendMessage(chat_id=1, text="a"))
+            with self.assertRaises(SendBacklogError):
+                await limiter(_make_request, None, edit)
+
+    async def test_dropped_preview_does_not_delay_sends(self) -> None:
+        limiter = SendRateLimiter(per_second=1.0)
+        with mock.patch.object(rate_limit.time, "monotonic", return_value=100.0):
+            await limiter(_make_request, None, SendMessage(chat_id=1, text="a"))
+            with self.assertRaises(SendBacklogError):
+                await limiter(
+                    _make_request, None, EditMessageText(chat_id=1, message_id=1, text="b")
+                )
+        self.assertEqual(limiter._next_slot, 101.0)
+
+    async def test_preview_edit_passes_when_idle(self) -> None:
+        limiter = SendRateLimiter(per_second=1.0)
+        edit = EditMessageText(chat_id=1, message_id=1, text="Доставка")
+        with mock.patch.object(rate_limit.time, "monotonic", return_value=100.0):
+            self.assertIs(await limiter(_make_request, None, edit), edit)
+
+
+if __name__ == "__main__":
+    unittest.main()
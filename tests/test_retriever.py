@@ -0,0 +1,36 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from mlcore.rag.retriever import KnowledgeRetriever
+
+
+class IndexFileTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        (self.root / "kb").mkdir()
+        (self.root / "kb" / "faq.md").write_text("Доставка занимает 3 дня.", encoding="utf-8")
+        self.index_file = str(self.root / "index.pkl")
+
+    def _load(self) -> KnowledgeRetriever:
+        return KnowledgeRetriever.from_directory(
+            str(self.root / "kb"),
+            chunk_size_chars=200,
+            chunk_overlap_chars=20,
+            top_k=3,
+            index_file=self.index_file,
+        )
+
+    def test_corrupt_index_is_rebuilt(self) -> None:
+        Path(self.index_file).write_bytes(b"\x80\x04\x95garbage")
+        with self.assertLogs("mlcore.rag.retriever", level="WARNING"):
+            retriever = self._load()
+
+        self.assertEqual(retriever.chunk_count, 1)
+        self.assertEqual(self._load().chunk_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+from unittest import mock
+
+from mlcore.rag.retriever import RetrievedChunk
+from supportbot.telegram import semantic_cache
+from supportbot.telegram.semantic_cache import SemanticAnswerCache
+
+_CHUNKS = [RetrievedChunk(text="Доставка 3 дня.", source="faq.md", score=0.9)]
+_EXACT = {"доставка": 1.0}
+_CLOSE = {"доставка": 0.96, "сроки": 0.28}
+_NO_TERMS: frozenset[str] = frozenset()
+
+
+class SemanticAnswerCacheTest(unittest.TestCase):
+    def test_expired_best_match_does_not_hide_fresh_entry(self) -> None:
+        cache = SemanticAnswerCache(ttl_seconds=10.0)
+        with mock.patch.object(semantic_cache.time, "monotonic", return_value=0.0):
+            cache.put(_EXACT, _NO_TERMS, _CHUNKS, ("старый ответ", False))
+        with mock.patch.object(semantic_cache.time, "monotonic", return_value=8.0):
+            cache.put(_CLOSE, _NO_TERMS, _CHUNKS, ("новый ответ", False))
+        with mock.patch.object(semantic_cache.time, "monotonic", return_value=12.0):
+            self.assertEqual(cache.get(_EXACT, _NO_TERMS, _CHUNKS), ("новый ответ", False))
+
+    def test_expired_entry_alone_is_a_miss(self) -> None:
+        cache = SemanticAnswerCache(ttl_seconds=10.0)
+        with mock.patch.object(semantic_cache.time, "monotonic", return_value=0.0):
+            cache.put(_EXACT, _NO_TERMS, _CHUNKS, ("старый ответ", False))
+        with mock.patch.object(semantic_cache.time, "monotonic", return_value=12.0):
+            self.assertIsNone(cache.get(_EXACT, _NO_TERMS, _CHUNKS))
+
+    def test_unindexed_terms_must_match(self) -> None:
+        cache = SemanticAnswerCache()
+        cache.put(_EXACT, frozenset({"москву"}), _CHUNKS, ("в Москву 2 дня", False))
+
+        self.assertIsNone(cache.get(_EXACT, frozenset({"казань"}), _CHUNKS))
+        self.assertIsNone(cache.get(_EXACT, frozenset({"москву", "48213"}), _CHUNKS))
+        self.assertEqual(
+            cache.get(_EXACT, frozenset({"москву"}), _CHUNKS), ("в Москву 2 дня", False)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()